@@ -1,4 +1,11 @@
 from django.contrib import admin
-from .models import User
+from .models import User, OutboxEmail
 # Register your models here.
-admin.site.register(User)
\ No newline at end of file
+admin.site.register(User)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    exclude = ("message",)
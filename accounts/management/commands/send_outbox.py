@@ -0,0 +1,38 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Send the emails queued in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help="Emails sent over one SMTP connection",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep polling every INTERVAL seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+        while True:
+            sent, failed = deliver_batch(batch_size)
+            if sent or failed or interval <= 0:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Sent {sent} email(s), {failed} failed")
+                )
+            # a full batch means more are probably due already
+            if sent + failed >= batch_size:
+                continue
+            if interval <= 0:
+                return
+            time.sleep(interval)
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:36
+
+import projects.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_country_user_date_of_birth_user_facebook'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(storage=projects.storage.get_content_addressed_storage, upload_to='media/profile_pics'),
+        ),
+    ]
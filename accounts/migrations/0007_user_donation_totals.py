@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:40
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_donation_totals(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    Donation = apps.get_model("projects", "Donation")
+    donations = Donation.objects.filter(user=OuterRef("pk")).values("user")
+    User.objects.update(
+        donations_total=Coalesce(
+            Subquery(donations.annotate(total=Sum("amount")).values("total")),
+            Decimal("0.00"),
+        ),
+        projects_donated_count=Coalesce(
+            Subquery(
+                donations.annotate(
+                    projects=Count("project", distinct=True)
+                ).values("projects")
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_outboxemail'),
+        ('projects', '0022_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='donations_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='projects_donated_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_donation_totals, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,10 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 import uuid
+from decimal import Decimal
 from django.core.validators import RegexValidator
+from projects.counters import CounterFieldsMixin
+from projects.storage import get_content_addressed_storage
 
 
 egyptian_phone_validator = RegexValidator(
@@ -11,7 +14,7 @@ egyptian_phone_validator = RegexValidator(
 )
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField("email address", unique=True)
     mobile_phone = models.CharField(
         "mobile phone",
@@ -21,12 +24,18 @@ class User(AbstractUser):
     )
     profile_picture = models.ImageField(
         upload_to="media/profile_pics",
+        storage=get_content_addressed_storage,
     )
     is_active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     date_of_birth = models.DateField(null=True, blank=True)
     facebook = models.URLField(max_length=200, blank=True, null=True)
     country = models.CharField(max_length=100, blank=True, null=True)
+    # Maintained on every donation, rebuilt by ``manage.py rebuild_counters``
+    donations_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00")
+    )
+    projects_donated_count = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = [
@@ -37,6 +46,46 @@ class User(AbstractUser):
         "profile_picture",
     ]
 
+    # Only ever written with F() updates, a full save() must not overwrite
+    # them with the values loaded earlier
+    COUNTER_FIELDS = ("donations_total", "projects_donated_count")
+
+    @classmethod
+    def adjust_donations(cls, user_id, amount, projects=0):
+        """Move the stored donation totals of a user by the given deltas"""
+        cls.objects.filter(pk=user_id).update(
+            donations_total=models.F("donations_total") + amount,
+            projects_donated_count=models.F("projects_donated_count") + projects,
+        )
+
+    @classmethod
+    def add_donation(cls, donation):
+        """Count a newly created donation in its donor's stored totals"""
+        if donation.user_id is None:
+            return
+        first_to_project = (
+            not type(donation)
+            .objects.filter(user_id=donation.user_id, project_id=donation.project_id)
+            .exclude(pk=donation.pk)
+            .exists()
+        )
+        cls.adjust_donations(donation.user_id, donation.amount, int(first_to_project))
+
+    @classmethod
+    def remove_donation(cls, donation, donor_removed=False):
+        """Take a deleted donation back out of its donor's stored totals
+
+        See ``Project.remove_donation`` for ``donor_removed``.
+        """
+        if donation.user_id is None:
+            return
+        last_to_project = not donor_removed and (
+            not type(donation)
+            .objects.filter(user_id=donation.user_id, project_id=donation.project_id)
+            .exists()
+        )
+        cls.adjust_donations(donation.user_id, -donation.amount, -int(last_to_project))
+
     def get_total_donations(self):
         return self.donations.aggregate(total=models.Sum("amount"))["total"] or 0
 
@@ -51,3 +100,41 @@ class ActivationToken(models.Model):
 
     def is_valid(self):
         return (timezone.now() - self.created_at).total_seconds() < 24 * 60 * 60
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be delivered by ``manage.py send_outbox``"""
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENDING, "Sending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    subject = models.CharField(max_length=255, blank=True)
+    # the complete MIME message, as it goes over SMTP
+    message = models.BinaryField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.UUIDField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_due_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
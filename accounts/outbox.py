@@ -0,0 +1,136 @@
+"""Email outbox: messages are stored by ``OutboxBackend`` inside the request
+and delivered later by ``manage.py send_outbox``.
+
+The worker sends due messages in batches over one connection of the
+``OUTBOX_DELIVERY_BACKEND`` and retries failures with exponential backoff
+until ``OUTBOX_MAX_ATTEMPTS``.
+"""
+
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Q
+from django.utils import timezone
+from .models import OutboxEmail
+
+# a claim older than this belongs to a worker that died mid-batch
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Store outgoing messages in the outbox instead of sending them"""
+
+    def send_messages(self, email_messages):
+        rows = [
+            OutboxEmail(
+                from_email=message.from_email or "",
+                recipients=message.recipients(),
+                subject=str(message.subject)[:255],
+                message=message.message().as_bytes(linesep="\r\n"),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        OutboxEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+class RawMessage:
+    def __init__(self, data):
+        self.data = bytes(data)
+
+    def as_bytes(self, unixfrom=False, linesep="\n"):
+        return self.data
+
+
+class StoredEmailMessage(EmailMessage):
+    """Hands an already rendered MIME message to a mail backend"""
+
+    def __init__(self, row):
+        super().__init__(from_email=row.from_email, to=row.recipients)
+        self.raw_message = RawMessage(row.message)
+
+    def message(self):
+        return self.raw_message
+
+
+def retry_delay(attempts):
+    delay = settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size):
+    """Reserve up to ``batch_size`` due messages for this worker"""
+    now = timezone.now()
+    due = OutboxEmail.objects.filter(
+        Q(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+        | Q(status=OutboxEmail.SENDING, next_attempt_at__lte=now - CLAIM_TIMEOUT)
+    ).order_by("next_attempt_at", "id")
+    claim = uuid.uuid4()
+    ids = list(due.values_list("id", flat=True)[:batch_size])
+    # a row claimed by another worker in the meantime no longer matches
+    due.filter(id__in=ids).update(
+        status=OutboxEmail.SENDING, claimed_by=claim, next_attempt_at=now
+    )
+    return list(OutboxEmail.objects.filter(claimed_by=claim).order_by("id"))
+
+
+def record_failure(row, error):
+    row.attempts += 1
+    row.last_error = f"{type(error).__name__}: {error}"
+    row.claimed_by = None
+    if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        row.status = OutboxEmail.FAILED
+    else:
+        row.status = OutboxEmail.PENDING
+        row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+    row.save(
+        update_fields=[
+            "attempts",
+            "last_error",
+            "claimed_by",
+            "status",
+            "next_attempt_at",
+        ]
+    )
+
+
+def deliver_batch(batch_size=None, connection=None):
+    """Send one batch of due messages, returns (sent, failed)"""
+    rows = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not rows:
+        return 0, 0
+    connection = connection or get_connection(
+        settings.OUTBOX_DELIVERY_BACKEND, fail_silently=False
+    )
+    sent, failed = 0, 0
+    try:
+        for row in rows:
+            try:
+                connection.open()
+                connection.send_messages([StoredEmailMessage(row)])
+            except Exception as error:
+                record_failure(row, error)
+                failed += 1
+                # start over with a fresh connection for the next message
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                continue
+            OutboxEmail.objects.filter(pk=row.pk).update(
+                status=OutboxEmail.SENT,
+                attempts=row.attempts + 1,
+                claimed_by=None,
+                sent_at=timezone.now(),
+                last_error="",
+            )
+            sent += 1
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    return sent, failed
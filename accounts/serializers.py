@@ -6,6 +6,7 @@ from djoser.serializers import (
     UserSerializer as BaseUserSerializer,
 )
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from projects.resize import image_url
 
 
 User = get_user_model()
@@ -68,7 +69,7 @@ class UserSerializer(BaseUserSerializer):
             except ValueError:
                 return None
 
-            return request.build_absolute_uri(obj.profile_picture.url)
+            return image_url(request, obj.profile_picture)
         return obj.profile_picture.url
 
 
@@ -103,7 +104,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
                 obj.profile_picture.url
             except ValueError:
                 return None
-            return request.build_absolute_uri(obj.profile_picture.url)
+            return image_url(request, obj.profile_picture)
         return obj.profile_picture.url
 
     def validate_username(self, value):
@@ -142,10 +143,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return value
 
     def get_total_donations(self, obj):
-        return obj.get_total_donations()
+        return obj.donations_total
 
     def get_total_projects_donated(self, obj):
-        return obj.get_total_projects_donated()
+        return obj.projects_donated_count
 
 
 class TokenObtainPairSerializer(TokenObtainPairSerializer):
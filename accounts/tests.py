@@ -1,3 +1,292 @@
-from django.test import TestCase
+import socketserver
+import threading
+from datetime import timedelta
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from projects.models import Donation, DonationCounterShard
+from projects.testing import create_category, create_project, create_user
+from .models import OutboxEmail, User
+from .outbox import deliver_batch
 
-# Create your tests here.
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of an SMTP server to accept or reject messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        # recipients whose RCPT is answered with a transient failure
+        self.reject = set()
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stand-in ready")
+        recipients = []
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 stand-in")
+            elif command.startswith("MAIL FROM"):
+                recipients = []
+                self.reply("250 OK")
+            elif command.startswith("RCPT TO"):
+                address = command.split(":", 1)[1].strip("<> ").lower()
+                if address in self.server.reject:
+                    self.reply("451 Try again later")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                    data += chunk
+                self.server.messages.append((recipients, data))
+                self.reply("250 OK")
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn()
+        self.enterContext(self.server)
+        self.enterContext(
+            override_settings(
+                EMAIL_BACKEND="accounts.outbox.OutboxBackend",
+                OUTBOX_DELIVERY_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                EMAIL_HOST="127.0.0.1",
+                EMAIL_PORT=self.server.server_address[1],
+                EMAIL_USE_TLS=False,
+                EMAIL_USE_SSL=False,
+                EMAIL_HOST_USER="",
+                EMAIL_HOST_PASSWORD="",
+                EMAIL_TIMEOUT=5,
+                OUTBOX_RETRY_BACKOFF=60,
+                OUTBOX_MAX_ATTEMPTS=3,
+            )
+        )
+
+    def send(self, *recipients):
+        for recipient in recipients:
+            mail.send_mail("Activate", "Welcome", "noreply@example.com", [recipient])
+
+    def test_send_mail_only_enqueues(self):
+        self.send("a@example.com")
+
+        self.assertEqual(self.server.connections, 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertEqual(email.recipients, ["a@example.com"])
+
+    def test_batch_is_sent_over_one_connection(self):
+        self.send("a@example.com", "b@example.com", "c@example.com")
+
+        self.assertEqual(deliver_batch(10), (3, 0))
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(
+            [recipients for recipients, _ in self.server.messages],
+            [["a@example.com"], ["b@example.com"], ["c@example.com"]],
+        )
+        self.assertIn(b"Subject: Activate", self.server.messages[0][1])
+        self.assertFalse(
+            OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists()
+        )
+        self.assertEqual(deliver_batch(10), (0, 0))
+
+    def test_transient_failure_is_retried_with_backoff(self):
+        self.server.reject.add("b@example.com")
+        self.send("a@example.com", "b@example.com", "c@example.com")
+
+        before = timezone.now()
+        self.assertEqual(deliver_batch(10), (2, 1))
+
+        failed = OutboxEmail.objects.get(recipients=["b@example.com"])
+        self.assertEqual(failed.status, OutboxEmail.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("451", failed.last_error)
+        self.assertGreaterEqual(failed.next_attempt_at, before + timedelta(seconds=60))
+        # not due yet
+        self.assertEqual(deliver_batch(10), (0, 0))
+
+        self.server.reject.clear()
+        OutboxEmail.objects.filter(pk=failed.pk).update(next_attempt_at=before)
+        self.assertEqual(deliver_batch(10), (1, 0))
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, OutboxEmail.SENT)
+        self.assertEqual(failed.attempts, 2)
+
+    def test_gives_up_after_max_attempts(self):
+        self.server.reject.add("a@example.com")
+        self.send("a@example.com")
+
+        for attempt in range(3):
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_batch(10), (0, 1))
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.FAILED)
+        self.assertEqual(email.attempts, 3)
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_batch(10), (0, 0))
+
+
+class DonationTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_user("donor")
+        cls.project = create_project(cls.donor, create_category())
+
+    def test_totals_follow_donations(self):
+        Donation.objects.create(user=self.donor, project=self.project, amount=10)
+        donation = Donation.objects.create(
+            user=self.donor, project=self.project, amount=15
+        )
+        self.donor.refresh_from_db()
+        self.assertEqual(
+            (self.donor.donations_total, self.donor.projects_donated_count), (25, 1)
+        )
+
+        donation.delete()
+
+        self.donor.refresh_from_db()
+        self.assertEqual(
+            (self.donor.donations_total, self.donor.projects_donated_count), (10, 1)
+        )
+
+    def test_save_of_a_stale_instance_keeps_the_totals(self):
+        stale = User.objects.get(pk=self.donor.pk)
+        Donation.objects.create(user=self.donor, project=self.project, amount=10)
+
+        stale.first_name = "Renamed"
+        stale.save()
+
+        stored = User.objects.get(pk=self.donor.pk)
+        self.assertEqual(stored.first_name, "Renamed")
+        self.assertEqual(stored.donations_total, 10)
+        self.assertEqual(stored.projects_donated_count, 1)
+
+
+class UserDonationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_user("donor")
+        cls.project = create_project(
+            cls.donor, create_category("Health"), title="Clinic", total_target=200
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+
+    def summary(self):
+        response = self.client.get(f"/api/users/{self.donor.pk}/donations")
+        return response.data["results"][0]["project"]
+
+    def test_each_donation_shows_a_project_summary(self):
+        Donation.objects.create(user=self.donor, project=self.project, amount=50)
+
+        summary = self.summary()
+
+        self.assertEqual(
+            set(summary), {"id", "title", "category", "thumbnail", "progress"}
+        )
+        self.assertEqual(summary["id"], self.project.pk)
+        self.assertEqual(summary["title"], "Clinic")
+        self.assertEqual(summary["category"], "Health")
+        self.assertTrue(summary["thumbnail"].endswith(self.project.thumbnail.url))
+
+    def test_progress_counts_donations_not_folded_yet(self):
+        Donation.objects.create(user=self.donor, project=self.project, amount=50)
+        self.assertEqual(self.summary()["progress"], 25.0)
+
+        Donation.objects.create(user=self.donor, project=self.project, amount=25)
+        self.assertEqual(self.summary()["progress"], 37.5)
+
+        DonationCounterShard.fold()
+        self.assertEqual(self.summary()["progress"], 37.5)
+
+
+class QueryBudgetTests(TestCase):
+    """Account endpoints run a fixed number of queries, whatever the page size"""
+
+    PAGE_SIZES = (1, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(
+                email=f"user{i}@example.com",
+                username=f"user{i}",
+                mobile_phone="01012345678",
+                profile_picture="images/default_avatar.jpg",
+                is_active=True,
+            )
+            for i in range(20)
+        )
+        cls.donor = create_user("donor", is_staff=True)
+        category = create_category()
+        for i in range(20):
+            project = create_project(cls.donor, category, title=f"Project {i}")
+            project.tags.add("all")
+            Donation.objects.create(user=cls.donor, project=project, amount=10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+        cache.clear()
+
+    def get(self, url, budget, params=None):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, response.content[:200])
+        return response
+
+    def assertListBudget(self, url, budget, params=None):
+        for page_size in self.PAGE_SIZES:
+            with self.subTest(url=url, page_size=page_size, params=params):
+                response = self.get(
+                    url, budget, {**(params or {}), "page_size": page_size}
+                )
+                results = response.data["results"]
+                self.assertGreaterEqual(len(results), min(page_size, 2))
+                self.assertLessEqual(len(results), page_size)
+
+    def test_user_donations(self):
+        url = f"/api/users/{self.donor.pk}/donations"
+        self.assertListBudget(url, 3)
+        self.assertListBudget(url, 2, {"cursor": ""})
+
+    def test_profile(self):
+        # the donation totals are stored on the user row
+        self.get("/api/profile/update", 0)
+        self.get("/auth/users/me/", 0)
+
+    def test_user_list(self):
+        self.assertListBudget("/auth/users/", 2)
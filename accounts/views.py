@@ -4,6 +4,7 @@ from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from projects.serializers import DonationSerializer
 from projects.models import Donation
+from projects.pagination import CreatedAtCursorPagination, get_paginator
 from .models import User
 from .serializers import UserProfileSerializer
 from rest_framework import status
@@ -17,13 +18,21 @@ class CustomPagination(PageNumberPagination):
     max_page_size = 3
 
 
+class CursorPagination(CreatedAtCursorPagination):
+    page_size = 3
+    page_size_query_param = "page_size"
+    max_page_size = 3
+
+
 class UserDonations(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
         user = get_object_or_404(User, pk=pk)
-        user_donations = Donation.getUserDonations(user)
-        paginator = CustomPagination()
+        user_donations = Donation.withSummaries(Donation.getUserDonations(user))
+        paginator = get_paginator(
+            request, user_donations, CustomPagination, CursorPagination
+        )
         paginated_donations = paginator.paginate_queryset(user_donations, request)
         serializer = DonationSerializer(
             paginated_donations, many=True, context={"request": request}
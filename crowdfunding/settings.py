@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "projects.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -96,10 +97,42 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Take the write lock when a transaction starts, so concurrent
+            # writers queue up instead of failing with "database is locked",
+            # and let readers carry on while a write is in progress.
+            "transaction_mode": "IMMEDIATE",
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared backend (Redis, Memcached) when running several worker
+# processes, so they see each other's invalidations.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "crowdfunding",
+    }
+}
+
+# Seconds an anonymous project list/detail response may be served from cache
+PROJECT_RESPONSE_CACHE_TIMEOUT = 300
+
+# Rows each project's new donations are spread over, see DonationCounterShard
+DONATION_COUNTER_SHARDS = 8
+
+# Request metrics served at /metrics, see projects.metrics. With several
+# worker processes point METRICS_DIR at a directory shared by all of them.
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -152,7 +185,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "projects.pagination.SizedPageNumberPagination",
     "PAGE_SIZE": 10,
 }
 
@@ -208,7 +241,14 @@ load_dotenv()
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Emails are queued in the outbox and sent by ``manage.py send_outbox``
+EMAIL_BACKEND = "accounts.outbox.OutboxBackend"
+OUTBOX_DELIVERY_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+# Seconds before the first retry, doubled on each further failure
+OUTBOX_RETRY_BACKOFF = 60
+OUTBOX_MAX_RETRY_DELAY = 6 * 60 * 60
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -223,3 +263,28 @@ PASSWORD_RESET_TIMEOUT = 86400
 # Media files configuration
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+
+# Threads rendering resized thumbnail and gallery variants after an upload,
+# 0 renders them right after the request's transaction commits instead
+IMAGE_VARIANT_WORKERS = 2
+IMAGE_VARIANT_QUALITY = 85
+
+# On-demand renditions served from /media/resize/<w>x<h>/<path>
+IMAGE_RESIZE_CACHE_ROOT = BASE_DIR / "resize_cache"
+IMAGE_RESIZE_CACHE_BYTES = 512 * 1024 * 1024
+# Only these <w>x<h> boxes are rendered, so clients can't fill the cache
+# with arbitrary sizes
+IMAGE_RESIZE_SIZES = [
+    (64, 64),
+    (128, 128),
+    (256, 256),
+    (320, 240),
+    (480, 360),
+    (640, 480),
+    (960, 720),
+    (1280, 960),
+]
+# Content-addressed uploads never change under their name and are cached for
+# good, other paths can be replaced and are revalidated after a shorter time
+IMAGE_RESIZE_MAX_AGE = 365 * 24 * 60 * 60
+IMAGE_RESIZE_MUTABLE_MAX_AGE = 60 * 60
@@ -2,11 +2,19 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from projects.metrics import metrics
+from projects.resize import resize_image
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("accounts.urls")),
     path("api/", include("projects.urls")),
+    path(
+        "media/resize/<int:width>x<int:height>/<path:path>",
+        resize_image,
+        name="media-resize",
+    ),
+    path("metrics", metrics, name="metrics"),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,143 @@
+"""Micro-benchmarks for the serializers, aggregates and listing queries.
+
+``manage.py benchmark`` builds a scratch database per dataset size, fills it
+with ``build_dataset`` and times each case in ``CASES``. Results are written
+as JSON so runs on different commits can be compared with ``--compare``.
+"""
+
+import statistics
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from . import generator
+from .models import Category, Donation, PlatformStatistics, Project
+from .serializers import (
+    DonationSerializer,
+    ProjectDetailSerializer,
+    ProjectStoreSerializer,
+)
+
+PAGE_SIZE = 50
+
+
+def dataset_shape(size):
+    """Rows per table for a dataset of ``size`` donations"""
+    return {
+        "users": max(10, size // 10),
+        "projects": max(10, size // 20),
+        "donations": size,
+        "ratings": size // 4,
+        "comments": size // 4,
+    }
+
+
+def build_dataset(size, seed=0, workers=1, stdout=None):
+    """Fill an empty database with ``size`` donations and related rows"""
+    return generator.generate(
+        **dataset_shape(size), seed=seed, workers=workers, stdout=stdout
+    )
+
+
+def dataset_size():
+    return Donation.objects.count()
+
+
+def allowed_host():
+    """A host name ``ALLOWED_HOSTS`` accepts, for requests made in-process"""
+    return next(
+        (host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"),
+        "localhost",
+    )
+
+
+def _request():
+    # serializers build absolute media URLs, the host has to be allowed
+    return APIRequestFactory().get(
+        "/api/projects", {"page_size": PAGE_SIZE}, HTTP_HOST=allowed_host()
+    )
+
+
+def _listing(**filters):
+    return lambda: list(Project.filterProjects(**filters)[:PAGE_SIZE])
+
+
+def _serialize_projects():
+    request = _request()
+    projects = Project.filterProjects(with_stats=True)[:PAGE_SIZE]
+    return ProjectStoreSerializer(
+        projects, many=True, context={"request": request}
+    ).data
+
+
+def _serialize_detail():
+    project = (
+        Project.objects.filter(is_accepted=True)
+        .order_by("-donors_count")
+        .first()
+    )
+    return ProjectDetailSerializer(
+        Project.objects.get(pk=project.pk), context={"request": _request()}
+    ).data
+
+
+def _serialize_donations():
+    donations = Donation.withSummaries(
+        Donation.objects.order_by("-created_at", "-id")
+    )[:PAGE_SIZE]
+    return DonationSerializer(
+        donations, many=True, context={"request": _request()}
+    ).data
+
+
+def _search_term():
+    return generator.tag_names(1)[0]
+
+
+def _category():
+    return str(Category.objects.order_by("id").values_list("id", flat=True)[0])
+
+
+CASES = {
+    "serializer.project_store_many": _serialize_projects,
+    "serializer.project_detail": _serialize_detail,
+    "serializer.donation_many": _serialize_donations,
+    "filter.default": _listing(),
+    "filter.featured": _listing(is_featured="true"),
+    "filter.category": lambda: _listing(category=_category())(),
+    "filter.tags_any": _listing(tags="tag0,tag1"),
+    "filter.tags_all": _listing(tags="tag0,tag1", tags_match="all"),
+    "filter.search": lambda: _listing(search=_search_term())(),
+    "filter.created_range": lambda: _listing(
+        created_after=(timezone.now() - timedelta(days=30)).date().isoformat()
+    )(),
+    "filter.latest": _listing(latest="true"),
+    "filter.top": _listing(is_top="true"),
+    "filter.most_funded": _listing(ordering="most_funded"),
+    "filter.ending_soon": _listing(ordering="ending_soon"),
+    "filter.trending": _listing(trending="true"),
+    "model.top_rated": lambda: list(Project.getTopRatedProjects()),
+    "model.platform_statistics": PlatformStatistics.get,
+}
+
+
+def measure(case, repeat):
+    """Time ``case`` ``repeat`` times, after an untimed run counting queries"""
+    with CaptureQueriesContext(connection) as queries:
+        case()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case()
+        timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if repeat > 1 else 0.0,
+        "queries": len(queries),
+    }
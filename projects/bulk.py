@@ -0,0 +1,158 @@
+"""Bulk donation ingestion for the batch endpoint and ``import_donations``.
+
+Rows are validated against one project and one user lookup per chunk,
+inserted with ``bulk_create`` and folded into the stored aggregates once per
+project per chunk. ``bulk_create`` skips the donation signals, so the
+aggregates they maintain are all updated in ``apply_donation_batch``.
+"""
+
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import User
+from .models import Project, Donation, DonationBucket, PlatformStatistics
+from . import cache as project_cache
+
+DEFAULT_CHUNK_SIZE = 1000
+MIN_AMOUNT = Decimal("1.00")
+# Donation.amount is max_digits=10, decimal_places=2
+MAX_AMOUNT = Decimal("99999999.99")
+
+
+def _parse_id(value):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return False
+
+
+def _field(row, name):
+    return row.get(name) if isinstance(row, dict) else None
+
+
+def _build_donation(row, projects, users):
+    if not isinstance(row, dict):
+        return None, {"non_field_errors": ["Expected an object for each row."]}
+    errors = {}
+
+    project_id = _parse_id(row.get("project"))
+    if project_id is None:
+        errors["project"] = ["This field is required."]
+    elif project_id not in projects:
+        errors["project"] = [
+            f'Invalid pk "{row.get("project")}" - object does not exist.'
+        ]
+
+    user_id = _parse_id(row.get("user"))
+    if user_id is not None and user_id not in users:
+        errors["user"] = [f'Invalid pk "{row.get("user")}" - object does not exist.']
+
+    try:
+        amount = Decimal(str(row.get("amount", ""))).quantize(Decimal("0.01"))
+        if not amount.is_finite():
+            # NaN would only fail later, in the range comparison
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors["amount"] = ["A valid number is required."]
+    else:
+        if not MIN_AMOUNT <= amount <= MAX_AMOUNT:
+            errors["amount"] = [
+                f"Ensure this value is between {MIN_AMOUNT} and {MAX_AMOUNT}."
+            ]
+
+    if errors:
+        return None, errors
+    return Donation(project_id=project_id, user_id=user_id, amount=amount), None
+
+
+def apply_donation_batch(donations, known_donors):
+    """Fold inserted donations into the stored aggregates.
+
+    ``known_donors`` holds the (project_id, user_id) pairs that already had a
+    donation before the batch, so only first-time backers are counted.
+    """
+    per_project = defaultdict(
+        lambda: {"amount": Decimal("0"), "count": 0, "donors": set()}
+    )
+    per_user = defaultdict(lambda: {"amount": Decimal("0"), "projects": set()})
+    for donation in donations:
+        totals = per_project[donation.project_id]
+        totals["amount"] += donation.amount
+        totals["count"] += 1
+        if donation.user_id is None:
+            continue
+        per_user[donation.user_id]["amount"] += donation.amount
+        if (donation.project_id, donation.user_id) not in known_donors:
+            totals["donors"].add(donation.user_id)
+            per_user[donation.user_id]["projects"].add(donation.project_id)
+
+    now = timezone.now()
+    for project_id, totals in per_project.items():
+        Project.adjust_funding(project_id, totals["amount"], len(totals["donors"]))
+        DonationBucket.record(project_id, now, totals["amount"], totals["count"])
+    for user_id, totals in per_user.items():
+        User.adjust_donations(user_id, totals["amount"], len(totals["projects"]))
+    PlatformStatistics.adjust(
+        total_money_raised=sum(totals["amount"] for totals in per_project.values())
+    )
+    project_cache.invalidate_projects(list(per_project))
+
+
+def ingest_chunk(rows, first_row=0):
+    """Validate and insert one chunk of rows, returns one result per row"""
+    project_ids = {_parse_id(_field(row, "project")) for row in rows}
+    user_ids = {_parse_id(_field(row, "user")) for row in rows}
+    projects = set(
+        Project.objects.filter(
+            pk__in=[pk for pk in project_ids if pk], is_active=True
+        ).values_list("pk", flat=True)
+    )
+    users = set(
+        User.objects.filter(pk__in=[pk for pk in user_ids if pk]).values_list(
+            "pk", flat=True
+        )
+    )
+
+    results, pending = [], []
+    for index, row in enumerate(rows, first_row):
+        donation, errors = _build_donation(row, projects, users)
+        if errors:
+            results.append({"row": index, "status": "error", "errors": errors})
+        else:
+            pending.append((index, donation))
+
+    if pending:
+        donations = [donation for _, donation in pending]
+        with transaction.atomic():
+            known_donors = set(
+                Donation.objects.filter(
+                    project_id__in={donation.project_id for donation in donations},
+                    user_id__in={donation.user_id for donation in donations},
+                )
+                .values_list("project_id", "user_id")
+                .distinct()
+            )
+            Donation.objects.bulk_create(donations)
+            apply_donation_batch(donations, known_donors)
+        results += [
+            {"row": index, "status": "created", "id": donation.pk}
+            for index, donation in pending
+        ]
+
+    return sorted(results, key=lambda result: result["row"])
+
+
+def ingest_donations(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Validate and insert ``rows`` in chunked transactions"""
+    results = []
+    for offset in range(0, len(rows), chunk_size):
+        results += ingest_chunk(rows[offset : offset + chunk_size], offset)
+    return results
+
+
+def summarize(results):
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created}
@@ -0,0 +1,135 @@
+"""Read-through cache for anonymous project list and detail responses, and
+for the first page of each project's comment and rating feeds.
+
+Cached responses are keyed on a version token: one for the project listing,
+one per project and one per project feed. Writes replace the token (see
+``projects.signals``), which orphans every response built from the old
+data, so nothing has to be deleted explicitly.
+"""
+
+import uuid
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+LIST_VERSION_KEY = "projects:version:list"
+FEEDS = ("comments", "ratings")
+HITS_KEY = "projects:response-cache:hits"
+MISSES_KEY = "projects:response-cache:misses"
+
+
+def _project_version_key(project_id):
+    return f"projects:version:{project_id}"
+
+
+def _feed_version_key(project_id, feed):
+    return f"projects:version:{project_id}:{feed}"
+
+
+def _version(key):
+    return cache.get_or_set(key, uuid.uuid4().hex, timeout=None)
+
+
+def _bump(*keys):
+    def replace_tokens():
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+    # Wait for the commit, or a concurrent read could cache the old rows
+    # under the new token.
+    transaction.on_commit(replace_tokens)
+
+
+def invalidate_projects(project_ids, listing=True):
+    keys = [_project_version_key(project_id) for project_id in project_ids]
+    if listing:
+        keys.append(LIST_VERSION_KEY)
+    _bump(*keys)
+
+
+def invalidate_project(project_id, listing=True):
+    invalidate_projects([project_id], listing=listing)
+
+
+def invalidate_feed(project_id, feed):
+    _bump(_feed_version_key(project_id, feed))
+
+
+def invalidate_feeds(project_ids, feeds=FEEDS):
+    _bump(
+        *(
+            _feed_version_key(project_id, feed)
+            for project_id in project_ids
+            for feed in feeds
+        )
+    )
+
+
+def _count(key):
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def response_key(request, scope, version):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return f"projects:response:{scope}:{version}:{request.get_host()}:{query}"
+
+
+def cached_response(request, build, project_id=None):
+    """Serve ``build()``'s response from the cache for anonymous requests"""
+    if request.user.is_authenticated:
+        return build()
+
+    if project_id is None:
+        scope, version_key = "list", LIST_VERSION_KEY
+    else:
+        scope, version_key = f"detail:{project_id}", _project_version_key(project_id)
+    key = response_key(request, scope, _version(version_key))
+    return _read_through(key, build)
+
+
+def is_first_page(request):
+    return request.query_params.get("page", "1") == "1" and not (
+        request.query_params.get("cursor")
+    )
+
+
+def cached_feed(request, project_id, feed, build):
+    """Serve the first page of a project's ``feed`` from the cache.
+
+    Feeds look the same to every user, so authenticated requests are
+    cached too. Later pages are rarely read and always built.
+    """
+    if not is_first_page(request):
+        return build()
+    version = _version(_feed_version_key(project_id, feed))
+    key = response_key(request, f"{feed}:{project_id}", version)
+    return _read_through(key, build)
+
+
+def _read_through(key, build):
+    data = cache.get(key)
+    if data is not None:
+        _count(HITS_KEY)
+        return Response(data)
+
+    _count(MISSES_KEY)
+    response = build()
+    if response.status_code == 200:
+        cache.set(key, response.data, settings.PROJECT_RESPONSE_CACHE_TIMEOUT)
+    return response
+
+
+def stats():
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+    }
@@ -0,0 +1,48 @@
+"""Conditional GET support keyed on ``Project.version`` and its counter shards.
+
+The validators are read with a single indexed lookup before anything is
+serialized, so a client that already has the current representation gets a
+``304 Not Modified`` without the view running its serializers.
+"""
+
+from django.db.models import Max, Sum
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .models import Project
+
+
+def project_validators(scope, pk, **filters):
+    """Return the (ETag, Last-Modified timestamp) of a project resource"""
+    # Donations land in the counter shards without touching the project row
+    stamp = (
+        Project.objects.filter(pk=pk, **filters)
+        .annotate(
+            pending=Sum("counter_shards__count"),
+            shards_updated_at=Max("counter_shards__updated_at"),
+        )
+        .values_list("version", "updated_at", "pending", "shards_updated_at")
+        .first()
+    )
+    if stamp is None:
+        raise Http404("No Project matches the given query.")
+    version, updated_at, pending, shards_updated_at = stamp
+    if shards_updated_at:
+        updated_at = max(updated_at, shards_updated_at)
+    return f'"{scope}-{pk}-{version}.{pending or 0}"', int(updated_at.timestamp())
+
+
+def conditional_response(request, validators, build):
+    """Answer with 304 when the client is current, otherwise ``build()``"""
+    etag, last_modified = validators
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return not_modified
+
+    response = build()
+    if response.status_code == 200:
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,27 @@
+"""Keeping ``save()`` away from columns that are only written with F()."""
+
+
+class CounterFieldsMixin:
+    """Leave ``COUNTER_FIELDS`` and ``WORKER_FIELDS`` out of a full save.
+
+    Both are maintained with F() updates or by a background worker, so a
+    regular save of an instance loaded earlier must never write its stale
+    copy back. Pass ``update_fields`` to write them explicitly.
+    """
+
+    COUNTER_FIELDS = ()
+    WORKER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            skipped = self.COUNTER_FIELDS + self.WORKER_FIELDS
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
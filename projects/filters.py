@@ -0,0 +1,171 @@
+from datetime import datetime, time, timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from taggit.models import TaggedItem
+from . import search as project_search
+
+
+def _parse_bound(value, end=False):
+    """Parse an ISO date or datetime; a bare date covers the whole day"""
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.combine(day + timedelta(days=int(end)), time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class ProjectFilter:
+    """Build the project listing queryset from the list query parameters.
+
+    Every filter narrows the same queryset, so they all combine in a single
+    query. The filters and orderings match the partial indexes declared on
+    ``Project.Meta``.
+    """
+
+    ORDERINGS = {
+        "latest": ("-created_at", "-id"),
+        "oldest": ("created_at", "id"),
+        "top_rated": ("-rating_average", "-id"),
+        "most_funded": ("-donations_total", "-id"),
+        "ending_soon": ("end_time", "id"),
+        "trending": ("-trending_amount", "-trending_count", "-id"),
+    }
+    DEFAULT_ORDERING = "latest"
+    # latest=true and is_top=true return a short list unless a limit is given
+    DEFAULT_SHORTLIST_LIMIT = 5
+
+    def __init__(
+        self,
+        user=None,
+        user_id=None,
+        category=None,
+        tags=None,
+        tags_match="any",
+        is_featured=None,
+        search=None,
+        created_after=None,
+        created_before=None,
+        ordering=None,
+        latest=None,
+        is_top=None,
+        trending=None,
+        window=None,
+        limit=None,
+        with_stats=False,
+    ):
+        self.user = user
+        # an invalid id is ignored, like an invalid category
+        self.user_id = _parse_id(user_id)
+        self.category = category
+        self.tags = [tag.strip() for tag in (tags or "").split(",") if tag.strip()]
+        self.tags_match = tags_match
+        self.is_featured = is_featured
+        self.search = search
+        self.created_after = _parse_bound(created_after)
+        self.created_before = _parse_bound(created_before, end=True)
+        self.ordering = ordering
+        self.latest = latest == "true"
+        self.is_top = is_top == "true"
+        self.trending = trending == "true" or ordering == "trending"
+        self.window = window
+        self.limit = limit
+        self.with_stats = with_stats
+
+    def base_queryset(self):
+        from .models import Project
+
+        # staff and owner listings include projects still waiting for review
+        if (self.user and self.user.is_staff) or self.user_id:
+            return Project.objects.all()
+        return Project.getAcceptedProjects()
+
+    def queryset(self):
+        from .models import Project, DonationBucket
+
+        projects = self.base_queryset()
+        if self.user_id:
+            projects = projects.filter(user_id=self.user_id)
+        if self.is_featured in ("true", "false"):
+            projects = projects.filter(is_featured=self.is_featured == "true")
+        category_id = _parse_id(self.category)
+        if category_id is not None:
+            projects = projects.filter(category_id=category_id)
+        projects = self.filter_tags(projects)
+        if self.created_after:
+            projects = projects.filter(created_at__gte=self.created_after)
+        if self.created_before:
+            projects = projects.filter(created_at__lt=self.created_before)
+        if self.search:
+            projects = project_search.search_projects(projects, self.search)
+        if self.trending:
+            projects = DonationBucket.annotateTrending(projects, self.window)
+
+        ordering = self.get_ordering()
+        if ordering:
+            projects = projects.order_by(*self.ORDERINGS[ordering])
+
+        if self.with_stats:
+            projects = Project.withStats(projects)
+
+        limit = self.get_limit()
+        if limit:
+            projects = projects[:limit]
+        return projects
+
+    def filter_tags(self, projects):
+        if not self.tags:
+            return projects
+        tagged = TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(projects.model)
+        )
+        if self.tags_match == "all":
+            for tag in self.tags:
+                projects = projects.filter(
+                    pk__in=tagged.filter(tag__name=tag).values("object_id")
+                )
+            return projects
+        return projects.filter(
+            pk__in=tagged.filter(tag__name__in=self.tags).values("object_id")
+        )
+
+    def get_ordering(self):
+        if self.trending:
+            return "trending"
+        if self.is_top:
+            return "top_rated"
+        if self.latest:
+            return "latest"
+        if self.ordering in self.ORDERINGS:
+            return self.ordering
+        if self.search:
+            # keep the relevance ordering of the search
+            return None
+        return self.DEFAULT_ORDERING
+
+    def get_limit(self):
+        try:
+            limit = int(self.limit)
+        except (ValueError, TypeError):
+            limit = None
+        if limit and limit > 0:
+            return limit
+        if self.is_top or self.latest:
+            return self.DEFAULT_SHORTLIST_LIMIT
+        return None
@@ -0,0 +1,493 @@
+"""Synthetic data for development, load tests and benchmarks.
+
+``generate`` adds users, projects, donations, ratings and comments with
+``bulk_create`` in chunks. Popularity is skewed the way real traffic is:
+projects, donors and tags are drawn from a Zipf distribution, so a few
+projects collect most of the donations. Every user shares one precomputed
+password hash and every image row points at a handful of shared blobs, so
+neither hashing nor file writes scale with the row count.
+
+Donations, ratings and comments can be generated by several processes.
+bulk_create skips the signals, so the counters, the trending buckets and
+the search index are computed once at the end, with one statement per table.
+"""
+
+import itertools
+import multiprocessing
+import random
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    FloatField,
+    Max,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from PIL import Image
+from taggit.models import Tag, TaggedItem
+from accounts.models import User
+from .models import (
+    Category,
+    Comments,
+    Donation,
+    DonationBucket,
+    MediaBlob,
+    PlatformStatistics,
+    Project,
+    ProjectImages,
+    Ratting,
+)
+from .storage import ContentAddressedStorage, content_addressed_storage
+
+DEFAULT_PASSWORD = "Seed@1234"
+CATEGORIES = {
+    "Technology": "Projects involving innovative tech solutions and gadgets.",
+    "Art & Design": "Creative projects in visual arts, design, and multimedia.",
+    "Education": "Educational initiatives and learning platforms.",
+    "Environment": "Projects focused on environmental sustainability and conservation.",
+    "Health": "Healthcare innovations and wellness projects.",
+}
+WORDS = (
+    "solar water school garden clinic library robot mural festival bike "
+    "clean ocean forest music theatre coding farm bakery repair community "
+    "recycling wellness museum podcast village bridge shelter kitchen"
+).split()
+COMMENTS = (
+    "Great idea, good luck!",
+    "Just donated, can't wait to see the results.",
+    "How will the funds be spent?",
+    "Shared this with my friends.",
+    "Any updates on the timeline?",
+)
+# Spread of created_at, longer than the 7 day trending window
+HISTORY = timedelta(days=60)
+ZIPF_EXPONENT = 1.1
+CHUNK_SIZE = 5000
+SHARED_IMAGES = 8
+
+
+def tag_names(count):
+    return [f"tag{i}" for i in range(count)]
+
+
+def zipf_weights(count, exponent):
+    """Cumulative weights of ranks 1..count, for ``random.choices``"""
+    return list(
+        itertools.accumulate(1 / rank**exponent for rank in range(1, count + 1))
+    )
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let ``bulk_create`` keep the given ``created_at`` values"""
+    fields = [model._meta.get_field("created_at") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def shared_images(count, media_root=None):
+    """Store ``count`` small placeholder images once, return their names"""
+    storage = (
+        ContentAddressedStorage(location=media_root)
+        if media_root
+        else content_addressed_storage
+    )
+    names = []
+    for i in range(count):
+        output = BytesIO()
+        color = (37 * i % 256, 91 * i % 256, 53 * i % 256)
+        Image.new("RGB", (800, 450), color).save(output, "JPEG")
+        names.append(
+            storage.save(f"seed-{i}.jpg", ContentFile(output.getvalue()))
+        )
+    return names
+
+
+class Plan:
+    """What the processes generating the child rows need to know"""
+
+    def __init__(self, seed, exponent, user_ids, project_ids, project_times, now):
+        self.seed = seed
+        self.now = now
+        self.user_ids = user_ids
+        self.project_ids = project_ids
+        self.project_times = project_times
+        # rank the rows randomly, so the popular ones aren't the oldest ones
+        rng = random.Random(seed)
+        self.project_ranks = rng.sample(range(len(project_ids)), len(project_ids))
+        self.donor_ranks = rng.sample(user_ids, len(user_ids))
+        self.project_weights = zipf_weights(len(project_ids), exponent)
+        self.donor_weights = zipf_weights(len(user_ids), exponent)
+
+    def rng(self, table, start):
+        return random.Random(f"{self.seed}-{table}-{start}")
+
+    def projects(self, rng, count):
+        """Indexes into ``project_ids`` of ``count`` Zipf distributed picks"""
+        return rng.choices(
+            self.project_ranks, cum_weights=self.project_weights, k=count
+        )
+
+    def moment_after(self, rng, index):
+        """A time between the creation of project ``index`` and now"""
+        created_at = self.project_times[index]
+        return created_at + (self.now - created_at) * rng.random()
+
+    def donations(self, start, count):
+        rng = self.rng("donations", start)
+        donors = rng.choices(self.donor_ranks, cum_weights=self.donor_weights, k=count)
+        recent = self.now - max(DonationBucket.WINDOWS.values())
+        buckets = defaultdict(lambda: [Decimal("0.00"), 0])
+        donations = []
+        for index, user_id in zip(self.projects(rng, count), donors):
+            amount = min(rng.lognormvariate(3.5, 1.2), 50000)
+            donation = Donation(
+                project_id=self.project_ids[index],
+                user_id=user_id,
+                amount=Decimal(f"{max(amount, 1):.2f}"),
+                created_at=self.moment_after(rng, index),
+            )
+            donations.append(donation)
+            if donation.created_at >= recent:
+                bucket = buckets[
+                    donation.project_id, DonationBucket.bucket_for(donation.created_at)
+                ]
+                bucket[0] += donation.amount
+                bucket[1] += 1
+        return donations, dict(buckets)
+
+    def ratings(self, start, count):
+        rng = self.rng("ratings", start)
+        return [
+            Ratting(
+                project_id=self.project_ids[index],
+                user_id=rng.choice(self.user_ids),
+                # mostly good ratings, like on real platforms
+                rate=Decimal(min(50, max(0, round(rng.gauss(40, 8))))) / 10,
+                created_at=self.moment_after(rng, index),
+            )
+            for index in self.projects(rng, count)
+        ]
+
+    def comments(self, start, count):
+        rng = self.rng("comments", start)
+        return [
+            Comments(
+                project_id=self.project_ids[index],
+                user_id=rng.choice(self.user_ids),
+                body=rng.choice(COMMENTS),
+                created_at=self.moment_after(rng, index),
+            )
+            for index in self.projects(rng, count)
+        ]
+
+
+_plan = None
+
+
+def _use_plan(plan):
+    global _plan
+    _plan = plan
+
+
+def _start_worker(plan, database_name):
+    _use_plan(plan)
+    # a spawned process starts without Django, a forked one with the
+    # parent's connections, which must not be shared
+    django.setup()
+    connections.close_all()
+    connection.settings_dict["NAME"] = database_name
+    if connection.vendor == "sqlite":
+        # the workers take turns on the database-wide write lock
+        connection.settings_dict["OPTIONS"] = {
+            **connection.settings_dict["OPTIONS"],
+            "timeout": 600,
+        }
+
+
+def _insert(task):
+    """Generate and insert one chunk, return its trending buckets"""
+    table, start, count = task
+    buckets = {}
+    with explicit_timestamps(Donation, Ratting, Comments):
+        if table == "donations":
+            rows, buckets = _plan.donations(start, count)
+            model = Donation
+        else:
+            rows = getattr(_plan, table)(start, count)
+            model = Ratting if table == "ratings" else Comments
+        with transaction.atomic():
+            model.objects.bulk_create(rows)
+    return table, count, buckets
+
+
+def _sum(queryset, field, default):
+    return Coalesce(
+        Subquery(queryset.annotate(total=Sum(field)).values("total")), default
+    )
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(queryset.annotate(count=Count(field, distinct=True)).values("count")),
+        0,
+    )
+
+
+def store_counters(projects, users):
+    """Compute the stored counters of the given new projects and users"""
+    donations = Donation.objects.filter(project=OuterRef("pk")).values("project")
+    ratings = Ratting.objects.filter(project=OuterRef("pk")).values("project")
+    projects.update(
+        donations_total=_sum(donations, "amount", Decimal("0.00")),
+        donors_count=_count(donations, "user"),
+        rating_sum=_sum(ratings, "rate", Decimal("0.0")),
+        rating_count=_count(ratings, "id"),
+    )
+    projects.update(
+        rating_average=Case(
+            When(
+                rating_count__gt=0,
+                then=Cast("rating_sum", FloatField()) / F("rating_count"),
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+    donations = Donation.objects.filter(user=OuterRef("pk")).values("user")
+    users.update(
+        donations_total=_sum(donations, "amount", Decimal("0.00")),
+        projects_donated_count=_count(donations, "project"),
+    )
+    PlatformStatistics.rebuild()
+
+
+def generate(
+    users=100,
+    projects=20,
+    donations=1000,
+    ratings=200,
+    comments=200,
+    tags=30,
+    exponent=ZIPF_EXPONENT,
+    seed=0,
+    workers=1,
+    chunk_size=CHUNK_SIZE,
+    password=DEFAULT_PASSWORD,
+    media_root=None,
+    stdout=None,
+):
+    """Add the given numbers of rows, next to whatever the database holds
+
+    The placeholder images are written to ``media_root``, ``MEDIA_ROOT`` by
+    default. Pass a temporary directory when the rows are thrown away.
+    """
+    if users < 1 or projects < 1:
+        raise ValueError("At least one user and one project are needed")
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    def moment():
+        return now - HISTORY * rng.random()
+
+    # hashing is deliberately slow, hash once for everybody
+    password_hash = make_password(password)
+    user_offset = User.objects.aggregate(last=Max("id"))["last"] or 0
+    with explicit_timestamps(User):
+        for start, count in _chunks(users, chunk_size):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    User(
+                        email=f"user{user_offset + i}@example.com",
+                        username=f"user{user_offset + i}",
+                        first_name="Seed",
+                        last_name=f"User {user_offset + i}",
+                        password=password_hash,
+                        mobile_phone=f"010{(user_offset + i) % 10**8:08d}",
+                        profile_picture="images/default_avatar.jpg",
+                        is_active=True,
+                        created_at=moment(),
+                    )
+                    for i in range(start, start + count)
+                )
+    user_ids = list(
+        User.objects.filter(id__gt=user_offset)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    log(f"{len(user_ids)} users, password {password}")
+
+    categories = [
+        Category.objects.get_or_create(
+            title=title, defaults={"description": description * 3}
+        )[0]
+        for title, description in CATEGORIES.items()
+    ]
+    names = tag_names(tags)
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=name) for name in names], ignore_conflicts=True
+    )
+    tag_ids = dict(Tag.objects.filter(name__in=names).values_list("name", "id"))
+    tag_weights = zipf_weights(len(names), exponent)
+    images = shared_images(SHARED_IMAGES, media_root)
+    image_references = Counter()
+    content_type = ContentType.objects.get_for_model(Project)
+
+    project_offset = Project.objects.aggregate(last=Max("id"))["last"] or 0
+    with explicit_timestamps(Project):
+        for start, count in _chunks(projects, chunk_size):
+            rows, project_tags = [], []
+            for i in range(start, start + count):
+                created_at = moment()
+                chosen = set(rng.choices(names, cum_weights=tag_weights, k=3))
+                words = " ".join(rng.choices(WORDS, k=12))
+                thumbnail = rng.choice(images)
+                image_references[thumbnail] += 1
+                rows.append(
+                    Project(
+                        title=(
+                            f"{rng.choice(WORDS).title()} project "
+                            f"{project_offset + i + 1}"
+                        ),
+                        details=f"{words}. Tagged {', '.join(sorted(chosen))}. " * 2,
+                        total_target=Decimal(rng.randrange(1000, 100000)),
+                        start_time=created_at,
+                        end_time=created_at + timedelta(days=rng.randrange(7, 90)),
+                        user_id=rng.choice(user_ids),
+                        category=rng.choice(categories),
+                        is_featured=rng.random() < 0.05,
+                        is_accepted=rng.random() < 0.9,
+                        thumbnail=thumbnail,
+                        created_at=created_at,
+                    )
+                )
+                project_tags.append(chosen)
+            with transaction.atomic():
+                created = Project.objects.bulk_create(rows)
+                if created[0].pk is None:
+                    # backends that can't return the ids of inserted rows
+                    created = Project.objects.filter(
+                        id__gt=project_offset
+                    ).order_by("id")[start : start + count]
+                TaggedItem.objects.bulk_create(
+                    TaggedItem(
+                        tag_id=tag_ids[name],
+                        content_type=content_type,
+                        object_id=project.pk,
+                    )
+                    for project, chosen in zip(created, project_tags)
+                    for name in chosen
+                )
+                gallery = []
+                for project in created:
+                    for position in range(rng.randrange(4)):
+                        image = rng.choice(images)
+                        image_references[image] += 1
+                        gallery.append(
+                            ProjectImages(
+                                project_id=project.pk, image=image, position=position
+                            )
+                        )
+                ProjectImages.objects.bulk_create(gallery)
+    for name, references in image_references.items():
+        MediaBlob.adjust_references([name], references)
+    project_ids, project_times = [], []
+    for project_id, created_at in (
+        Project.objects.filter(id__gt=project_offset)
+        .order_by("id")
+        .values_list("id", "created_at")
+    ):
+        project_ids.append(project_id)
+        project_times.append(created_at)
+    log(f"{len(project_ids)} projects, {len(names)} tags")
+
+    plan = Plan(seed, exponent, user_ids, project_ids, project_times, now)
+    tasks = [
+        (table, start, count)
+        for table, total in (
+            ("donations", donations),
+            ("ratings", ratings),
+            ("comments", comments),
+        )
+        for start, count in _chunks(total, chunk_size)
+    ]
+    database_name = connection.settings_dict["NAME"]
+    if workers > 1:
+        connections.close_all()
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with context.Pool(
+            workers, initializer=_start_worker, initargs=(plan, database_name)
+        ) as pool:
+            results = list(pool.imap_unordered(_insert, tasks))
+    else:
+        _use_plan(plan)
+        results = [_insert(task) for task in tasks]
+
+    totals = Counter()
+    buckets = defaultdict(lambda: [Decimal("0.00"), 0])
+    for table, count, chunk_buckets in results:
+        totals[table] += count
+        for key, (amount, donations_count) in chunk_buckets.items():
+            buckets[key][0] += amount
+            buckets[key][1] += donations_count
+    DonationBucket.objects.bulk_create(
+        (
+            DonationBucket(
+                project_id=project_id,
+                bucket_start=bucket_start,
+                amount=amount,
+                count=count,
+            )
+            for (project_id, bucket_start), (amount, count) in buckets.items()
+        ),
+        batch_size=chunk_size,
+    )
+    log(
+        f"{totals['donations']} donations, {totals['ratings']} ratings, "
+        f"{totals['comments']} comments"
+    )
+
+    store_counters(
+        Project.objects.filter(id__gt=project_offset),
+        User.objects.filter(id__gt=user_offset),
+    )
+    call_command("reindex", stdout=StringIO())
+    log("counters and search index rebuilt")
+    return {
+        "users": len(user_ids),
+        "projects": len(project_ids),
+        "tags": len(names),
+        **totals,
+    }
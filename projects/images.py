@@ -0,0 +1,188 @@
+"""Resized variants of project thumbnails and gallery images.
+
+Uploads are stored as they arrive and queued once the request's transaction
+commits. A small thread pool renders the variants with Pillow and records
+their names on the row; until then the serializers keep returning the
+original file.
+"""
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+from . import cache as project_cache
+from .storage import is_blob_name
+
+logger = logging.getLogger(__name__)
+
+# Bounding boxes, images are only ever scaled down
+VARIANTS = {
+    "card": (480, 360),
+    "gallery": (960, 720),
+    "detail": (1280, 960),
+}
+THUMBNAIL_VARIANTS = ("card", "detail")
+GALLERY_VARIANTS = ("gallery",)
+# Shared defaults that are never cleaned up
+PROTECTED_NAMES = {"images/default_thumbnail.jpg", "images/default_avatar.jpg"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(name, variant):
+    # keep the original extension, "a.png" and "a.jpg" must not collide
+    return f"variants/{variant}/{name}.jpg"
+
+
+def variants_ready(field_file, variants):
+    """Whether ``variants`` were rendered from the file currently stored"""
+    return bool(field_file) and (variants or {}).get("source") == field_file.name
+
+
+def variant_url(field_file, variants, variant):
+    """URL of a rendered variant, or of the original until it is ready"""
+    if variants_ready(field_file, variants) and variant in variants:
+        return default_storage.url(variants[variant])
+    return field_file.url
+
+
+def content_hash(upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def render(source, size):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        output = BytesIO()
+        image.save(
+            output,
+            "JPEG",
+            quality=settings.IMAGE_VARIANT_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+    return ContentFile(output.getvalue())
+
+
+def generate_variants(field_file, variants):
+    """Render ``variants`` of a stored image, returns the names to record"""
+    with field_file.storage.open(field_file.name, "rb") as source:
+        data = source.read()
+    names = {"source": field_file.name}
+    for variant in variants:
+        name = variant_name(field_file.name, variant)
+        # Uploaded names are unique, so an existing variant is already current
+        if not default_storage.exists(name):
+            name = default_storage.save(
+                name, render(BytesIO(data), VARIANTS[variant])
+            )
+        names[variant] = name
+    return names
+
+
+def process_thumbnail(project_id):
+    from .models import Project
+
+    project = (
+        Project.objects.filter(pk=project_id)
+        .only("thumbnail", "thumbnail_variants")
+        .first()
+    )
+    if project is None or not project.thumbnail:
+        return
+    if variants_ready(project.thumbnail, project.thumbnail_variants):
+        return
+    variants = generate_variants(project.thumbnail, THUMBNAIL_VARIANTS)
+    # skip the write if the thumbnail was replaced in the meantime
+    if Project.objects.filter(pk=project_id, thumbnail=project.thumbnail.name).update(
+        thumbnail_variants=variants
+    ):
+        Project.touch(project_id)
+        project_cache.invalidate_project(project_id)
+
+
+def process_gallery_image(image_id):
+    from .models import Project, ProjectImages
+
+    image = ProjectImages.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return
+    variants = generate_variants(image.image, GALLERY_VARIANTS)
+    ProjectImages.objects.filter(pk=image_id).update(variants=variants)
+    Project.touch(image.project_id)
+    project_cache.invalidate_project(image.project_id, listing=False)
+
+
+def delete_unreferenced(names):
+    """Delete stored images, and their variants, no row points to any more"""
+    from accounts.models import User
+    from .models import Project, ProjectImages
+
+    for name in set(names):
+        # blobs are shared and reference counted, see ``gc_media``
+        if not name or name in PROTECTED_NAMES or is_blob_name(name):
+            continue
+        if (
+            Project.objects.filter(thumbnail=name).exists()
+            or ProjectImages.objects.filter(image=name).exists()
+            or User.objects.filter(profile_picture=name).exists()
+        ):
+            continue
+        delete_with_variants(name)
+
+
+def delete_with_variants(name):
+    for stored in [name] + [variant_name(name, variant) for variant in VARIANTS]:
+        default_storage.delete(stored)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix="image-variants",
+            )
+    return _executor
+
+
+def run(job, *args):
+    try:
+        job(*args)
+    except Exception:
+        logger.exception("Could not render image variants: %s%r", job.__name__, args)
+
+
+def _run_in_worker(job, *args):
+    try:
+        run(job, *args)
+    finally:
+        # worker threads open their own connection
+        connection.close()
+
+
+def queue(job, *args):
+    """Run ``job`` in the worker pool once the current transaction commits"""
+
+    def submit():
+        if settings.IMAGE_VARIANT_WORKERS:
+            _get_executor().submit(_run_in_worker, job, *args)
+        else:
+            run(job, *args)
+
+    transaction.on_commit(submit)
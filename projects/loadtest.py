@@ -0,0 +1,339 @@
+"""Load test replaying a mix of API calls, for ``manage.py loadtest``.
+
+Every thread picks endpoints at random by their weight in the mix and
+records the latency and status of each call. Requests either go through
+the Django app in-process, or over HTTP to a running server. Projects are
+picked with the same Zipf skew as the generated data, so the popular ones
+are requested most. Authenticated calls send a JWT minted for one of the
+active users, a server reached over HTTP must share ``SECRET_KEY``.
+
+Donations and comments are really created, run it against a seeded copy
+of the data.
+"""
+
+import http.client
+import json
+import math
+import multiprocessing
+import random
+import threading
+import time
+from functools import partial
+from urllib.parse import urlencode, urlsplit
+from django.db import connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import User
+from .benchmarks import allowed_host
+from .generator import COMMENTS, WORDS, zipf_weights
+from .models import Category, Project
+from .pagination import CustomPagination
+
+FILTERS = (
+    {"ordering": "most_funded"},
+    {"ordering": "ending_soon"},
+    {"is_featured": "true"},
+    {"trending": "true"},
+    {"latest": "true"},
+)
+
+
+class InProcessTarget:
+    """Calls the Django app directly, without a network hop"""
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST=allowed_host(), raise_request_exception=False)
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        if method == "GET":
+            response = self.client.get(path, headers=headers)
+        else:
+            response = self.client.generic(
+                method,
+                path,
+                json.dumps(body),
+                content_type="application/json",
+                headers=headers,
+            )
+        return response.status_code
+
+
+class HTTPTarget:
+    """Calls a running server over one keep-alive connection"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=30)
+        self.prefix = parts.path.rstrip("/")
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(body)
+        try:
+            self.connection.request(method, self.prefix + path, body, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # reconnect on the next call
+            self.connection.close()
+            raise
+        return response.status
+
+
+class Fixtures:
+    """Rows the calls refer to, read once before the run"""
+
+    def __init__(self, users):
+        projects = Project.objects.filter(is_active=True, is_accepted=True)
+        # the most funded projects are the most visited
+        self.project_ids = list(
+            projects.order_by("-donors_count", "-id").values_list("id", flat=True)
+        )
+        if not self.project_ids:
+            raise ValueError("There are no accepted projects, run seed_data first")
+        self.project_weights = zipf_weights(len(self.project_ids), 1.1)
+        pages = math.ceil(len(self.project_ids) / CustomPagination.page_size)
+        self.page_weights = zipf_weights(pages, 1.1)
+        self.category_ids = list(Category.objects.values_list("id", flat=True))
+        self.tokens = [
+            str(AccessToken.for_user(user))
+            for user in User.objects.filter(is_active=True).order_by("?")[:users]
+        ]
+        if not self.tokens:
+            raise ValueError("There are no active users, run seed_data first")
+
+
+class Session:
+    """One thread's view of the run"""
+
+    def __init__(self, target, fixtures, rng):
+        self.target = target
+        self.fixtures = fixtures
+        self.rng = rng
+        self.token = rng.choice(fixtures.tokens)
+
+    def project(self):
+        return self.rng.choices(
+            self.fixtures.project_ids, cum_weights=self.fixtures.project_weights
+        )[0]
+
+    def get(self, path, params=None, token=None):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        return self.target.request("GET", path, token=token)
+
+    def post(self, path, body):
+        return self.target.request("POST", path, body, token=self.token)
+
+
+def browse(session):
+    page = session.rng.choices(
+        range(1, len(session.fixtures.page_weights) + 1),
+        cum_weights=session.fixtures.page_weights,
+    )[0]
+    return session.get("/api/projects", {"page": page})
+
+
+def browse_filtered(session):
+    params = dict(session.rng.choice(FILTERS))
+    if session.fixtures.category_ids and session.rng.random() < 0.5:
+        params["category"] = session.rng.choice(session.fixtures.category_ids)
+    if session.rng.random() < 0.2:
+        params = {"search": session.rng.choice(WORDS)}
+    return session.get("/api/projects", params)
+
+
+def project_detail(session):
+    return session.get(f"/api/projects/{session.project()}/")
+
+
+def project_comments(session):
+    return session.get(f"/api/projects/{session.project()}/comments")
+
+
+def post_comment(session):
+    return session.post(
+        f"/api/projects/{session.project()}/comments",
+        {"body": session.rng.choice(COMMENTS)},
+    )
+
+
+def donate(session):
+    amount = f"{session.rng.lognormvariate(3.5, 1.2) + 1:.2f}"
+    return session.post(
+        f"/api/projects/{session.project()}/donations", {"amount": amount}
+    )
+
+
+def profile(session):
+    return session.get("/auth/users/me/", token=session.token)
+
+
+ENDPOINTS = {
+    "projects.browse": browse,
+    "projects.filter": browse_filtered,
+    "projects.detail": project_detail,
+    "comments.list": project_comments,
+    "comments.create": post_comment,
+    "donations.create": donate,
+    "users.me": profile,
+}
+DEFAULT_MIX = {
+    "projects.browse": 30,
+    "projects.filter": 10,
+    "projects.detail": 25,
+    "comments.list": 10,
+    "comments.create": 5,
+    "donations.create": 10,
+    "users.me": 10,
+}
+
+
+def parse_mix(text):
+    """``name=weight,...`` into a mix, checked against ``ENDPOINTS``"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(
+                f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}"
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"The weight of {name} must be a number")
+        if mix[name] < 0:
+            raise ValueError(f"The weight of {name} can't be negative")
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return mix
+
+
+def _worker(make_target, fixtures, mix, seed, warmup_end, deadline, limit, samples):
+    rng = random.Random(seed)
+    session = Session(make_target(), fixtures, rng)
+    names = list(mix)
+    weights = list(mix.values())
+    recorded = []
+    while len(recorded) < limit:
+        start = time.monotonic()
+        if start >= deadline:
+            break
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            status = ENDPOINTS[name](session)
+        except Exception:
+            # connection errors and the like, counted as failures
+            status = None
+        latency = time.perf_counter() - started
+        if start >= warmup_end:
+            recorded.append((name, latency, status))
+    samples.extend(recorded)
+    connections.close_all()
+
+
+def run_threads(target, fixtures, mix, threads, duration, warmup, limit, seed):
+    """Run ``threads`` threads for ``duration`` seconds after ``warmup``
+
+    Returns the ``(endpoint, latency, status)`` samples of the measured
+    part and its length in seconds.
+    """
+    make_target = partial(HTTPTarget, target) if target else InProcessTarget
+    samples = []
+    now = time.monotonic()
+    warmup_end = now + warmup
+    deadline = warmup_end + duration
+    workers = [
+        threading.Thread(
+            target=_worker,
+            args=(
+                make_target,
+                fixtures,
+                mix,
+                f"{seed}-{i}",
+                warmup_end,
+                deadline,
+                limit,
+                samples,
+            ),
+        )
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return samples, max(time.monotonic() - warmup_end, 1e-9)
+
+
+def _run_process(arguments):
+    # forked with the parent's database connections, which must not be shared
+    connections.close_all()
+    return run_threads(*arguments)
+
+
+def run(target, fixtures, mix, threads, processes, duration, warmup, limit, seed):
+    """Run the threads in ``processes`` processes and merge their samples"""
+    if processes == 1:
+        return run_threads(
+            target, fixtures, mix, threads, duration, warmup, limit, seed
+        )
+    connections.close_all()
+    arguments = [
+        (target, fixtures, mix, threads, duration, warmup, limit, f"{seed}-{i}")
+        for i in range(processes)
+    ]
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        results = pool.map(_run_process, arguments)
+    samples = [sample for part, _ in results for sample in part]
+    return samples, max(elapsed for _, elapsed in results)
+
+
+def percentile(ordered, share):
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def _statistics(samples, elapsed):
+    latencies = sorted(latency for _, latency, _ in samples)
+    errors = {}
+    for _, _, status in samples:
+        if status is None or status >= 400:
+            key = str(status or "exception")
+            errors[key] = errors.get(key, 0) + 1
+    failed = sum(errors.values())
+    return {
+        "requests": len(samples),
+        "throughput": len(samples) / elapsed,
+        "mean": sum(latencies) / len(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1],
+        "error_rate": failed / len(samples),
+        "errors": errors,
+    }
+
+
+def summarize(samples, elapsed):
+    """Throughput, latency percentiles and errors per endpoint and overall"""
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    summary = {
+        name: _statistics(endpoint_samples, elapsed)
+        for name, endpoint_samples in sorted(by_endpoint.items())
+    }
+    if samples:
+        summary["total"] = _statistics(samples, elapsed)
+    return summary
@@ -0,0 +1,186 @@
+import json
+import platform
+import subprocess
+import tempfile
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from projects import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the serializers, model aggregates and listing queries on "
+        "generated datasets of the given sizes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000",
+            help="Comma separated dataset sizes, in donations (e.g. 1000,100000)",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Timed runs of each case"
+        )
+        parser.add_argument(
+            "--cases",
+            default="",
+            help="Only run the cases whose name starts with one of these prefixes",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes generating the datasets",
+        )
+        parser.add_argument(
+            "--output", help="Write the results as JSON to this file ('-' for stdout)"
+        )
+        parser.add_argument(
+            "--compare", help="Results of an earlier run to compare against"
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the generated databases and reuse them on the next run",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be a comma separated list of numbers")
+        if min(sizes) < 1 or options["repeat"] < 1 or options["workers"] < 1:
+            raise CommandError("--sizes, --repeat and --workers must be positive")
+        prefixes = tuple(p for p in options["cases"].split(",") if p)
+        cases = {
+            name: case
+            for name, case in benchmarks.CASES.items()
+            if not prefixes or name.startswith(prefixes)
+        }
+        if not cases:
+            raise CommandError("No benchmark case matches --cases")
+        baseline = self.load_baseline(options["compare"])
+
+        results = []
+        for size in sizes:
+            with self.scratch_database(size, options["keepdb"]):
+                if benchmarks.dataset_size() == 0:
+                    self.log(f"Generating a dataset of {size} donations")
+                    benchmarks.build_dataset(
+                        size, options["seed"], options["workers"], self.log_writer()
+                    )
+                elif benchmarks.dataset_size() != size:
+                    raise CommandError(
+                        f"The kept database for size {size} holds a different "
+                        "dataset, run once without --keepdb to regenerate it"
+                    )
+                for name, case in cases.items():
+                    result = {"size": size, "case": name}
+                    result.update(benchmarks.measure(case, options["repeat"]))
+                    results.append(result)
+                    self.report(result, baseline.get((size, name)))
+
+        report = {
+            "commit": self.git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "seed": options["seed"],
+            "results": results,
+        }
+        if options["output"] == "-":
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.log(f"Results written to {options['output']}")
+
+    def log(self, message):
+        # stderr, so --output - stays valid JSON
+        self.stderr.write(message, style_func=lambda text: text)
+
+    def log_writer(self):
+        command = self
+
+        class Writer:
+            def write(self, message):
+                command.log(f"  {message}")
+
+        return Writer()
+
+    def report(self, result, baseline):
+        line = (
+            f"{result['size']:>9} {result['case']:<32} "
+            f"{result['median'] * 1000:>9.2f} ms {result['queries']:>4} queries"
+        )
+        if baseline:
+            change = (result["median"] - baseline["median"]) / baseline["median"]
+            line += f"  {change:+.1%} vs baseline"
+        self.log(line)
+
+    def load_baseline(self, path):
+        if not path:
+            return {}
+        try:
+            with open(path) as source:
+                data = json.load(source)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+        return {
+            (result["size"], result["case"]): result for result in data["results"]
+        }
+
+    def scratch_database(self, size, keepdb):
+        command = self
+
+        class ScratchDatabase:
+            """A database of its own for each size, built like the test one
+
+            Media files written meanwhile go to a temporary ``MEDIA_ROOT``.
+            """
+
+            def __enter__(self):
+                test_settings = connection.settings_dict.setdefault("TEST", {})
+                self.old_name = connection.settings_dict["NAME"]
+                self.old_test_name = test_settings.get("NAME")
+                if connection.vendor == "sqlite":
+                    name = str(settings.BASE_DIR / f"benchmark_{size}.sqlite3")
+                else:
+                    name = f"{self.old_name}_benchmark_{size}"
+                test_settings["NAME"] = name
+                self.media = tempfile.TemporaryDirectory(prefix="benchmark-media-")
+                self.media_settings = override_settings(MEDIA_ROOT=self.media.name)
+                self.media_settings.enable()
+                command.log(f"Preparing database {name}")
+                connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+                )
+
+            def __exit__(self, *exc_info):
+                connection.creation.destroy_test_db(
+                    self.old_name, verbosity=0, keepdb=keepdb
+                )
+                connection.settings_dict["TEST"]["NAME"] = self.old_test_name
+                self.media_settings.disable()
+                self.media.cleanup()
+
+        return ScratchDatabase()
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from accounts.models import User
+from projects.models import Project, Donation, DonationCounterShard
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure donation throughput to a single project with concurrent "
+        "writers, with one counter row versus the sharded counters"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            default="1,2,4,8",
+            help="Comma separated numbers of concurrent writers to try",
+        )
+        parser.add_argument(
+            "--donations",
+            type=int,
+            default=100,
+            help="Donations made by each writer",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=settings.DONATION_COUNTER_SHARDS,
+            help="Shards per project for the sharded run",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the benchmark project and donations afterwards",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            workers = [int(count) for count in options["workers"].split(",")]
+        except ValueError:
+            raise CommandError("--workers must be a comma separated list of numbers")
+        if options["donations"] < 1 or min(workers) < 1 or options["shards"] < 1:
+            raise CommandError("--workers, --donations and --shards must be positive")
+
+        user, project = self.create_fixtures()
+        self.stdout.write(
+            f"{'shards':>6} {'workers':>7} {'donations':>9} {'seconds':>8} "
+            f"{'per sec':>8} {'errors':>6}"
+        )
+        try:
+            for shards in (1, options["shards"]):
+                with override_settings(DONATION_COUNTER_SHARDS=shards):
+                    for count in workers:
+                        self.run(user, project, shards, count, options["donations"])
+                DonationCounterShard.fold([project.pk])
+        finally:
+            if not options["keep"]:
+                project.delete()
+                user.delete()
+
+    def create_fixtures(self):
+        stamp = int(time.time())
+        user = User.objects.create_user(
+            email=f"benchmark-{stamp}@example.com",
+            username=f"benchmark-{stamp}",
+            password=None,
+            mobile_phone="01000000000",
+            is_active=True,
+        )
+        now = timezone.now()
+        project = Project.objects.create(
+            title="Donation benchmark",
+            details="Created by the benchmark_donations command",
+            total_target=1000000,
+            start_time=now,
+            end_time=now + timedelta(days=1),
+            user=user,
+            is_accepted=True,
+        )
+        return user, project
+
+    def run(self, user, project, shards, workers, donations):
+        errors = []
+
+        def donate():
+            try:
+                for _ in range(donations):
+                    try:
+                        # the same unit of work as DonationStore.post
+                        with transaction.atomic():
+                            Donation.objects.create(user=user, project=project, amount=1)
+                    except OperationalError:
+                        errors.append(1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=donate) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        made = workers * donations - len(errors)
+        self.stdout.write(
+            f"{shards:>6} {workers:>7} {made:>9} {elapsed:>8.2f} "
+            f"{made / elapsed:>8.0f} {len(errors):>6}"
+        )
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from projects.models import DonationCounterShard
+
+
+class Command(BaseCommand):
+    help = "Fold the donation counter shards into the project counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep folding every INTERVAL seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            folded = DonationCounterShard.fold()
+            self.stdout.write(
+                self.style.SUCCESS(f"Folded counters for {folded} project(s)")
+            )
+            if interval <= 0:
+                return
+            time.sleep(interval)
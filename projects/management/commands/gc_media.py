@@ -0,0 +1,102 @@
+from collections import Counter
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import User
+from projects import images
+from projects.models import MediaBlob, Project, ProjectImages
+from projects.storage import content_addressed_storage, is_blob_name
+
+
+def live_references():
+    """Count the rows pointing at each blob"""
+    references = Counter()
+    for names in (
+        Project.objects.values_list("thumbnail", flat=True),
+        ProjectImages.objects.values_list("image", flat=True),
+        User.objects.values_list("profile_picture", flat=True),
+    ):
+        references.update(name for name in names.iterator() if is_blob_name(name))
+    return references
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed media blobs that nothing references"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep unreferenced blobs this long, uploads may still be in flight",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Recompute the reference counts from the tables first",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            self.recount(options["dry_run"])
+
+        collectable = MediaBlob.collectable(timedelta(hours=options["grace_hours"]))
+        deleted, freed = 0, 0
+        for blob in collectable.iterator():
+            if not options["dry_run"] and not self.delete(blob):
+                continue
+            deleted += 1
+            freed += blob.size
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {deleted} blob(s), {freed} byte(s)")
+        )
+
+    def delete(self, blob):
+        """Delete an unreferenced blob's row and file, returns whether it did
+
+        Both happen in one transaction, which an upload of the same bytes
+        waits for (see ``ContentAddressedStorage._save``), so the upload
+        never registers a file that is about to be deleted.
+        """
+        with transaction.atomic():
+            # skip blobs that were uploaded or referenced again meanwhile
+            if not MediaBlob.objects.filter(
+                pk=blob.pk, references__lte=0, updated_at=blob.updated_at
+            ).delete()[0]:
+                return False
+            images.delete_with_variants(blob.name)
+        return True
+
+    def recount(self, dry_run):
+        references = live_references()
+        drifted = []
+        for blob in MediaBlob.objects.iterator():
+            expected = references.pop(blob.name, 0)
+            if blob.references != expected:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{blob.name}: {blob.references} reference(s), expected {expected}"
+                    )
+                )
+                blob.references = expected
+                drifted.append(blob)
+        for name in references:
+            self.stdout.write(self.style.WARNING(f"{name}: referenced but not tracked"))
+        if not dry_run:
+            MediaBlob.objects.bulk_update(drifted, ["references"], batch_size=500)
+            for name, count in references.items():
+                if content_addressed_storage.exists(name):
+                    MediaBlob.objects.update_or_create(
+                        name=name,
+                        defaults={
+                            "references": count,
+                            "size": content_addressed_storage.size(name),
+                        },
+                    )
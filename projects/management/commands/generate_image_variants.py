@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from projects import images
+from projects.models import Project, ProjectImages
+
+
+class Command(BaseCommand):
+    help = "Render the missing thumbnail and gallery image variants"
+
+    def handle(self, *args, **options):
+        rendered = 0
+        projects = Project.objects.only("thumbnail", "thumbnail_variants")
+        for project in projects.iterator(chunk_size=500):
+            if not images.variants_ready(project.thumbnail, project.thumbnail_variants):
+                images.run(images.process_thumbnail, project.pk)
+                rendered += 1
+        for image in ProjectImages.objects.only("image", "variants").iterator(
+            chunk_size=500
+        ):
+            if not images.variants_ready(image.image, image.variants):
+                images.run(images.process_gallery_image, image.pk)
+                rendered += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Rendered variants for {rendered} image(s)")
+        )
@@ -0,0 +1,89 @@
+import csv
+import json
+from django.core.management.base import BaseCommand, CommandError
+from projects.bulk import DEFAULT_CHUNK_SIZE, ingest_chunk, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Import donations from a CSV (project,amount,user columns) or NDJSON "
+        "file in chunked bulk inserts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Input format, guessed from the file extension by default",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Rows validated and inserted per transaction",
+        )
+        parser.add_argument(
+            "--report",
+            help="Write the per-row results to this file as NDJSON",
+        )
+
+    def read_rows(self, handle, file_format):
+        if file_format == "csv":
+            yield from csv.DictReader(handle)
+            return
+        for line_number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # keep the row numbering aligned, the row is reported as invalid
+                self.stderr.write(f"Line {line_number}: {e}")
+                yield None
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "ndjson"
+        )
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        report = open(options["report"], "w") if options["report"] else None
+        totals = {"created": 0, "failed": 0}
+        try:
+            with open(path, newline="") as handle:
+                chunk, first_row = [], 0
+                for row in self.read_rows(handle, file_format):
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        self.import_chunk(chunk, first_row, totals, report)
+                        first_row += len(chunk)
+                        chunk = []
+                if chunk:
+                    self.import_chunk(chunk, first_row, totals, report)
+        except OSError as e:
+            raise CommandError(str(e))
+        finally:
+            if report:
+                report.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {totals['created']} donation(s), {totals['failed']} failed"
+            )
+        )
+
+    def import_chunk(self, rows, first_row, totals, report):
+        results = ingest_chunk(rows, first_row)
+        for key, value in summarize(results).items():
+            totals[key] += value
+        for result in results:
+            if report:
+                report.write(json.dumps(result) + "\n")
+            if result["status"] == "error":
+                self.stdout.write(
+                    self.style.WARNING(f"Row {result['row']}: {result['errors']}")
+                )
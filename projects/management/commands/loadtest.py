@@ -0,0 +1,124 @@
+import json
+import math
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from projects import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of API calls from many threads and report throughput, "
+        "latency percentiles and error rates per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server, e.g. http://127.0.0.1:8000 "
+            "(default: call the app in-process)",
+        )
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Concurrent clients per process"
+        )
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument(
+            "--duration", type=float, default=30, help="Measured seconds"
+        )
+        parser.add_argument(
+            "--warmup",
+            type=float,
+            default=3,
+            help="Seconds of unrecorded calls before the measurement",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            help="Stop after this many measured calls, spread over the clients",
+        )
+        parser.add_argument(
+            "--mix",
+            help="Endpoint weights, e.g. projects.detail=5,donations.create=1 "
+            f"(endpoints: {', '.join(loadtest.ENDPOINTS)})",
+        )
+        parser.add_argument(
+            "--users", type=int, default=20, help="Users to authenticate as"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        for name in ("threads", "processes", "users"):
+            if options[name] < 1:
+                raise CommandError(f"--{name} must be positive")
+        if options["duration"] <= 0 or options["warmup"] < 0:
+            raise CommandError("--duration must be positive and --warmup not negative")
+        clients = options["threads"] * options["processes"]
+        limit = (
+            math.ceil(options["requests"] / clients)
+            if options["requests"]
+            else math.inf
+        )
+        try:
+            mix = (
+                loadtest.parse_mix(options["mix"])
+                if options["mix"]
+                else loadtest.DEFAULT_MIX
+            )
+            fixtures = loadtest.Fixtures(options["users"])
+        except ValueError as error:
+            raise CommandError(error)
+
+        target = options["url"] or "in-process"
+        self.stdout.write(
+            f"{clients} clients against {target} for {options['duration']:g}s "
+            f"after {options['warmup']:g}s of warmup"
+        )
+        samples, elapsed = loadtest.run(
+            options["url"],
+            fixtures,
+            mix,
+            options["threads"],
+            options["processes"],
+            options["duration"],
+            options["warmup"],
+            limit,
+            options["seed"],
+        )
+        if not samples:
+            raise CommandError("No call completed, raise --duration")
+        summary = loadtest.summarize(samples, elapsed)
+        self.report(summary)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(
+                    {
+                        "created_at": timezone.now().isoformat(),
+                        "target": target,
+                        "threads": options["threads"],
+                        "processes": options["processes"],
+                        "duration": elapsed,
+                        "mix": mix,
+                        "endpoints": summary,
+                    },
+                    output,
+                    indent=2,
+                )
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, summary):
+        self.stdout.write(
+            f"{'endpoint':<18} {'requests':>8} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for name, stats in summary.items():
+            line = (
+                f"{name:<18} {stats['requests']:>8} {stats['throughput']:>8.1f} "
+                f"{stats['p50'] * 1000:>8.1f} {stats['p95'] * 1000:>8.1f} "
+                f"{stats['p99'] * 1000:>8.1f} {stats['error_rate']:>7.1%}"
+            )
+            if stats["errors"]:
+                line += "  " + ", ".join(
+                    f"{status}: {count}" for status, count in stats["errors"].items()
+                )
+            self.stdout.write(self.style.WARNING(line) if stats["errors"] else line)
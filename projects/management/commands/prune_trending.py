@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from projects.models import DonationBucket
+
+
+class Command(BaseCommand):
+    help = "Delete donation buckets that fell out of every trending window"
+
+    def handle(self, *args, **options):
+        deleted = DonationBucket.prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired bucket(s)"))
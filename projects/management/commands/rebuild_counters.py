@@ -0,0 +1,236 @@
+import math
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Sum,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
+from accounts.models import User
+from projects import cache as project_cache
+from projects.models import Project, Donation, Ratting, PlatformStatistics
+
+# SQLite returns computed decimal sums unrounded (e.g. 56065.6100000001),
+# they are rounded to the stored precision before being compared or written
+CENTS = Decimal("0.01")
+TENTHS = Decimal("0.1")
+
+
+def live_project_counters():
+    """Project rows annotated with counters computed from the source tables"""
+    donations = Donation.objects.filter(project=OuterRef("pk")).values("project")
+    ratings = Ratting.objects.filter(project=OuterRef("pk")).values("project")
+    return Project.withPendingFunding(Project.objects.all()).annotate(
+        live_donations_total=Coalesce(
+            Subquery(donations.annotate(total=Sum("amount")).values("total")),
+            Decimal("0.00"),
+        ),
+        live_donors_count=Coalesce(
+            Subquery(
+                donations.annotate(
+                    donors=Count("user", distinct=True)
+                ).values("donors")
+            ),
+            0,
+        ),
+        live_rating_sum=Coalesce(
+            Subquery(ratings.annotate(total=Sum("rate")).values("total")),
+            Decimal("0.0"),
+        ),
+        live_rating_count=Coalesce(
+            Subquery(ratings.annotate(count=Count("id")).values("count")), 0
+        ),
+    ).only(
+        "id",
+        "donations_total",
+        "donors_count",
+        "rating_sum",
+        "rating_count",
+        "rating_average",
+    )
+
+
+def expected_project_counters(project):
+    """The stored counters, less the donations still held in counter shards"""
+    rating_count = project.live_rating_count
+    rating_sum = Decimal(project.live_rating_sum).quantize(TENTHS)
+    return {
+        "donations_total": (
+            project.live_donations_total - project.pending_amount
+        ).quantize(CENTS),
+        "donors_count": project.live_donors_count - project.pending_donors,
+        "rating_sum": rating_sum,
+        "rating_count": rating_count,
+        "rating_average": (
+            float(rating_sum) / rating_count if rating_count else 0.0
+        ),
+    }
+
+
+def live_user_counters():
+    """User rows annotated with their totals computed from the donations table"""
+    donations = Donation.objects.filter(user=OuterRef("pk")).values("user")
+    return User.objects.annotate(
+        live_donations_total=Coalesce(
+            Subquery(donations.annotate(total=Sum("amount")).values("total")),
+            Decimal("0.00"),
+        ),
+        live_projects_donated_count=Coalesce(
+            Subquery(
+                donations.annotate(
+                    projects=Count("project", distinct=True)
+                ).values("projects")
+            ),
+            0,
+        ),
+    ).only("id", *User.COUNTER_FIELDS)
+
+
+def shifted(row, expected, fields):
+    """Move ``fields`` of ``row`` by ``expected - stored`` with F() expressions
+
+    Shard folds and donations landing between the read and the write move
+    the stored counters with F() updates too, absolute values would undo
+    them.
+    """
+    for field in fields:
+        delta = expected[field] - getattr(row, field)
+        setattr(row, field, F(field) + delta)
+    return row
+
+
+def project_shifted(project, expected):
+    shifted(
+        project,
+        expected,
+        ["donations_total", "donors_count", "rating_sum", "rating_count"],
+    )
+    # from the shifted sum and count, in the same UPDATE
+    project.rating_average = Case(
+        When(
+            GreaterThan(project.rating_count, 0),
+            then=Cast(project.rating_sum, FloatField()) / project.rating_count,
+        ),
+        default=0.0,
+    )
+    project.version = F("version") + 1
+    return project
+
+
+def counter_matches(stored, expected):
+    if isinstance(expected, float):
+        return math.isclose(stored, expected, abs_tol=1e-9)
+    return stored == expected
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized project and user counters from the source tables"
+
+    project_counters = [
+        "donations_total",
+        "donors_count",
+        "rating_sum",
+        "rating_count",
+        "rating_average",
+        "version",
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report counters that drifted, without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        check = options["check"]
+        drifted = (
+            self.reconcile_projects(check)
+            + self.reconcile_users(check)
+            + self.reconcile_platform(check)
+        )
+
+        if check and drifted:
+            raise CommandError(f"{drifted} counter row(s) have drifted")
+        if check:
+            self.stdout.write(self.style.SUCCESS("All counters are consistent"))
+
+    def report(self, label, field, stored, expected):
+        self.stdout.write(
+            self.style.WARNING(f"{label}: {field} is {stored}, expected {expected}")
+        )
+
+    def reconcile_projects(self, check):
+        drifted = []
+        for project in live_project_counters().iterator(chunk_size=2000):
+            expected = expected_project_counters(project)
+            changed = False
+            for field, value in expected.items():
+                stored = getattr(project, field)
+                if not counter_matches(stored, value):
+                    self.report(f"Project {project.pk}", field, stored, value)
+                    changed = True
+            if changed:
+                drifted.append(project_shifted(project, expected))
+
+        if not check:
+            with transaction.atomic():
+                Project.objects.bulk_update(
+                    drifted, self.project_counters, batch_size=500
+                )
+                project_cache.invalidate_projects(
+                    [project.pk for project in drifted]
+                )
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt counters for {len(drifted)} project(s)")
+            )
+        return len(drifted)
+
+    def reconcile_users(self, check):
+        drifted = []
+        for user in live_user_counters().iterator(chunk_size=2000):
+            expected = {}
+            changed = False
+            for field in User.COUNTER_FIELDS:
+                value = getattr(user, f"live_{field}")
+                if isinstance(value, Decimal):
+                    value = value.quantize(CENTS)
+                expected[field] = value
+                stored = getattr(user, field)
+                if stored != value:
+                    self.report(f"User {user.pk}", field, stored, value)
+                    changed = True
+            if changed:
+                drifted.append(shifted(user, expected, User.COUNTER_FIELDS))
+
+        if not check:
+            with transaction.atomic():
+                User.objects.bulk_update(drifted, User.COUNTER_FIELDS, batch_size=500)
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt donation totals for {len(drifted)} user(s)")
+            )
+        return len(drifted)
+
+    def reconcile_platform(self, check):
+        stats = PlatformStatistics.objects.filter(
+            pk=PlatformStatistics.SINGLETON_PK
+        ).first()
+        changed = False
+        for field, expected in PlatformStatistics.compute().items():
+            stored = getattr(stats, field, None)
+            if stored != expected:
+                self.report("Platform statistics", field, stored, expected)
+                changed = True
+
+        if not check:
+            PlatformStatistics.rebuild()
+            self.stdout.write(self.style.SUCCESS("Rebuilt platform statistics"))
+        return int(changed)
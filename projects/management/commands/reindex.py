@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from projects import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for projects"
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(
+                self.style.WARNING(
+                    "The database backend has no full-text index, nothing to rebuild"
+                )
+            )
+            return
+        indexed = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} project(s)"))
@@ -0,0 +1,231 @@
+"""Per-view request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` times every request and counts its database queries
+through ``connection.execute_wrapper``, then adds them to in-process
+histograms labelled by URL name, method and status. ``GET /metrics``
+renders them for Prometheus.
+
+With several worker processes set ``METRICS_DIR``: each process dumps its
+histograms there every ``METRICS_FLUSH_INTERVAL`` seconds and the endpoint
+adds up the dumps of all of them. Clear the directory when the server is
+restarted.
+"""
+
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICS = {
+    "http_request_duration_seconds": ("Request latency", LATENCY_BUCKETS),
+    "http_request_db_queries": ("Database queries per request", QUERY_BUCKETS),
+    "http_request_db_duration_seconds": (
+        "Time spent in database queries per request",
+        LATENCY_BUCKETS,
+    ),
+    "http_response_size_bytes": ("Response body size", SIZE_BUCKETS),
+}
+LABELS = ("view", "method", "status")
+UNMATCHED_VIEW = "unmatched"
+
+
+class Registry:
+    """Histograms of one process, keyed on (metric, labels)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        # a pid can be reused, the dump of an earlier process must survive
+        self.process_id = f"{self.pid}-{uuid.uuid4().hex[:8]}"
+        # bucket counts, then the sum and the count of the observations
+        self.series = {}
+        self.flushed_at = time.monotonic()
+
+    def observe(self, labels, values):
+        with self.lock:
+            if self.pid != os.getpid():
+                # forked from a process that already served requests
+                self.reset()
+            for metric, value in values.items():
+                buckets = METRICS[metric][1]
+                key = (metric, labels)
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = [0] * (len(buckets) + 2)
+                index = bisect.bisect_left(buckets, value)
+                if index < len(buckets):
+                    series[index] += 1
+                series[-2] += value
+                series[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {key: list(series) for key, series in self.series.items()}
+
+    def flush(self, force=False):
+        """Dump the histograms to ``METRICS_DIR`` if the interval has passed"""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed_at = now
+        data = [
+            [metric, list(labels), series]
+            for (metric, labels), series in self.snapshot().items()
+        ]
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=path, prefix=".")
+        with os.fdopen(handle, "w") as output:
+            json.dump(data, output)
+        os.replace(temporary, path / f"{self.process_id}.json")
+
+
+registry = Registry()
+
+
+def collect():
+    """The histograms of this process and of every other worker's dump"""
+    totals = registry.snapshot()
+    directory = settings.METRICS_DIR
+    if not directory or not os.path.isdir(directory):
+        return totals
+    own_dump = f"{registry.process_id}.json"
+    for entry in os.scandir(directory):
+        if entry.name.startswith(".") or entry.name == own_dump:
+            continue
+        try:
+            with open(entry.path) as dump:
+                data = json.load(dump)
+        except (OSError, ValueError):
+            continue
+        for metric, labels, series in data:
+            # skip dumps written with other buckets by an older release
+            if metric not in METRICS or len(series) != len(METRICS[metric][1]) + 2:
+                continue
+            key = (metric, tuple(labels))
+            current = totals.get(key)
+            totals[key] = (
+                [a + b for a, b in zip(current, series)] if current else series
+            )
+    return totals
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(totals):
+    lines = []
+    for metric, (help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for (name, labels), series in sorted(totals.items()):
+            if name != metric:
+                continue
+            label_text = ",".join(
+                f'{label}="{_escape(value)}"' for label, value in zip(LABELS, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(buckets, series):
+                cumulative += count
+                lines.append(
+                    f'{metric}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{metric}_bucket{{{label_text},le="+Inf"}} {series[-1]}')
+            lines.append(f"{metric}_sum{{{label_text}}} {_format_number(series[-2])}")
+            lines.append(f"{metric}_count{{{label_text}}} {series[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+class QueryTimer:
+    """``execute_wrapper`` counting the queries of one request and their time"""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED_VIEW
+    return match.view_name or match.route or UNMATCHED_VIEW
+
+
+def response_size(response):
+    if response.streaming:
+        try:
+            return int(response.get("Content-Length"))
+        except (TypeError, ValueError):
+            return None
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """Record latency, queries and response size of every request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        values = {
+            "http_request_duration_seconds": time.perf_counter() - start,
+            "http_request_db_queries": timer.queries,
+            "http_request_db_duration_seconds": timer.duration,
+        }
+        size = response_size(response)
+        if size is not None:
+            values["http_response_size_bytes"] = size
+        labels = (view_name(request), request.method, str(response.status_code))
+        registry.observe(labels, values)
+        registry.flush()
+        return response
+
+
+def metrics_allowed(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+@require_GET
+def metrics(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render(collect()), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:15
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Donation = apps.get_model("projects", "Donation")
+    totals = Donation.objects.values("project_id").annotate(
+        total=models.Sum("amount"),
+        donors=models.Count("user", distinct=True),
+    )
+    for row in totals:
+        Project.objects.filter(pk=row["project_id"]).update(
+            donations_total=row["total"], donors_count=row["donors"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_alter_commentsreports_user_alter_donation_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='donations_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='donors_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:16
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ratings(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Ratting = apps.get_model("projects", "Ratting")
+    ratings = Ratting.objects.values("project_id").annotate(
+        total=models.Sum("rate"), count=models.Count("id")
+    )
+    for row in ratings:
+        Project.objects.filter(pk=row["project_id"]).update(
+            rating_sum=row["total"],
+            rating_count=row["count"],
+            rating_average=float(row["total"]) / row["count"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_project_donation_counters'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='rating_average',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=1, default=Decimal('0.0'), max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-rating_average'], name='project_top_rated_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:17
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_project_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_money_raised', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('total_active_projects', models.PositiveIntegerField(default=0)),
+                ('total_featured', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
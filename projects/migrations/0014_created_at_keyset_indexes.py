@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_platformstatistics'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='comment_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['created_at', 'id'], name='donation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='donation_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='donation_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratting',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='rating_project_created_idx'),
+        ),
+    ]
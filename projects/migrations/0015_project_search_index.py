@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from projects import search
+
+
+def create_search_index(apps, schema_editor):
+    if not search.is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(search.CREATE_FTS_TABLE)
+    schema_editor.execute(search.POPULATE_FTS_TABLE)
+
+
+def drop_search_index(apps, schema_editor):
+    if search.is_supported(schema_editor.connection):
+        schema_editor.execute(search.DROP_FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('projects', '0014_created_at_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
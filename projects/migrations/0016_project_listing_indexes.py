@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_project_search_index'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_accepted', True), ('is_active', True)), fields=['-created_at', '-id'], name='project_listed_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_accepted', True), ('is_active', True), ('is_featured', True)), fields=['-created_at', '-id'], name='project_listed_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_accepted', True), ('is_active', True)), fields=['category', '-created_at', '-id'], name='project_listed_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_accepted', True), ('is_active', True)), fields=['-rating_average', '-id'], name='project_listed_top_rated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_accepted', True), ('is_active', True)), fields=['-donations_total', '-id'], name='project_listed_funded_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from decimal import Decimal
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+BUCKET_SECONDS = 10 * 60
+
+
+def backfill_buckets(apps, schema_editor):
+    Donation = apps.get_model("projects", "Donation")
+    DonationBucket = apps.get_model("projects", "DonationBucket")
+    buckets = defaultdict(lambda: [0, 0])
+    recent = Donation.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=7)
+    ).values_list("project_id", "created_at", "amount")
+    for project_id, created_at, amount in recent.iterator():
+        timestamp = int(created_at.timestamp())
+        start = datetime.fromtimestamp(
+            timestamp - timestamp % BUCKET_SECONDS, tz=dt_timezone.utc
+        )
+        buckets[project_id, start][0] += amount
+        buckets[project_id, start][1] += 1
+    DonationBucket.objects.bulk_create(
+        [
+            DonationBucket(
+                project_id=project_id, bucket_start=start, amount=amount, count=count
+            )
+            for (project_id, start), (amount, count) in buckets.items()
+        ],
+        batch_size=500,
+    )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_project_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='donation_buckets', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start', 'project'], name='donation_bucket_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'bucket_start'), name='donation_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0018_donationbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('donors', models.IntegerField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'shard'), name='counter_shard_unique')],
+            },
+        ),
+    ]
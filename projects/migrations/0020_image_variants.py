@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0019_donationcountershard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='projectimages',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:35
+
+import hashlib
+from django.db import migrations, models
+
+
+def backfill_gallery(apps, schema_editor):
+    ProjectImages = apps.get_model("projects", "ProjectImages")
+    changed = []
+    positions = {}
+    for image in ProjectImages.objects.order_by("project_id", "id").iterator():
+        positions[image.project_id] = positions.get(image.project_id, 0) + 1
+        image.position = positions[image.project_id]
+        try:
+            with image.image.open("rb") as stored:
+                digest = hashlib.sha256()
+                for chunk in stored.chunks():
+                    digest.update(chunk)
+                image.content_hash = digest.hexdigest()
+        except (OSError, ValueError):
+            # missing file, left without a hash
+            pass
+        changed.append(image)
+    ProjectImages.objects.bulk_update(
+        changed, ["position", "content_hash"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0020_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='projectimages',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='projectimages',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='projectimages',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='projectimages',
+            index=models.Index(fields=['project', 'content_hash'], name='image_project_hash_idx'),
+        ),
+        migrations.RunPython(backfill_gallery, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:36
+
+import django.utils.timezone
+import projects.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0021_gallery_order_and_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='thumbnail',
+            field=models.ImageField(default='images/default_thumbnail.jpg', storage=projects.storage.get_content_addressed_storage, upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='projectimages',
+            name='image',
+            field=models.ImageField(storage=projects.storage.get_content_addressed_storage, upload_to='images/'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('references', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['references', 'updated_at'], name='media_blob_gc_idx')],
+            },
+        ),
+    ]
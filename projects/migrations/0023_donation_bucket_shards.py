@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0022_mediablob'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='donationbucket',
+            name='donation_bucket_unique',
+        ),
+        migrations.AddField(
+            model_name='donationbucket',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='donationbucket',
+            constraint=models.UniqueConstraint(fields=('project', 'bucket_start', 'shard'), name='donation_bucket_shard_unique'),
+        ),
+    ]
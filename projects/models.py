@@ -1,8 +1,18 @@
-from django.db import models
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 from taggit.managers import TaggableManager
 from accounts.models import User
 from decimal import Decimal
 from django.core.validators import MinValueValidator, MaxValueValidator
+from . import cache as project_cache
+from . import images
+from .counters import CounterFieldsMixin
+from .storage import get_content_addressed_storage
 
 
 class Category(models.Model):
@@ -14,7 +24,7 @@ class Category(models.Model):
         return f"{self.title}"
 
 
-class Project(models.Model):
+class Project(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=200)
     details = models.TextField()
     total_target = models.DecimalField(max_digits=10, decimal_places=2)
@@ -28,8 +38,74 @@ class Project(models.Model):
     is_featured = models.BooleanField(default=False)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     thumbnail = models.ImageField(
-        upload_to="images/", default="images/default_thumbnail.jpg"
+        upload_to="images/",
+        default="images/default_thumbnail.jpg",
+        storage=get_content_addressed_storage,
     )
+    # Resized copies of the thumbnail, written by the image worker
+    thumbnail_variants = models.JSONField(default=dict, blank=True)
+    donations_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00")
+    )
+    donors_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.DecimalField(
+        max_digits=12, decimal_places=1, default=Decimal("0.0")
+    )
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_average = models.FloatField(default=0.0)
+    # Bumped on every write to the project or its children, used as ETag
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-rating_average"],
+                condition=models.Q(is_active=True),
+                name="project_top_rated_idx",
+            ),
+            models.Index(fields=["created_at", "id"], name="project_created_idx"),
+            # Partial indexes for the public listing (is_active and
+            # is_accepted). SQLite compares boolean filters as bare columns,
+            # which only a partial index predicate can match.
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_active=True, is_accepted=True),
+                name="project_listed_created_idx",
+            ),
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_active=True, is_accepted=True, is_featured=True),
+                name="project_listed_featured_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                condition=models.Q(is_active=True, is_accepted=True),
+                name="project_listed_category_idx",
+            ),
+            models.Index(
+                fields=["-rating_average", "-id"],
+                condition=models.Q(is_active=True, is_accepted=True),
+                name="project_listed_top_rated_idx",
+            ),
+            models.Index(
+                fields=["-donations_total", "-id"],
+                condition=models.Q(is_active=True, is_accepted=True),
+                name="project_listed_funded_idx",
+            ),
+        ]
+
+    # Maintained with F() updates only, left out of a full save()
+    COUNTER_FIELDS = (
+        "donations_total",
+        "donors_count",
+        "rating_sum",
+        "rating_count",
+        "rating_average",
+        "version",
+    )
+    # Written by the image worker only, left out for the same reason
+    WORKER_FIELDS = ("thumbnail_variants",)
 
     def __str__(self):
         return self.title
@@ -64,69 +140,72 @@ class Project(models.Model):
 
     @classmethod
     def getTopRatedProjects(cls, limit=5):
-        return (
-            cls.getAvtiveProjects()
-            .annotate(avg_rating=models.Avg("ratings__rate"))
-            .order_by("-avg_rating")[:limit]
-        )
-
-    @classmethod
-    def filterProjects(
-        cls,
-        is_featured=None,
-        category=None,
-        tags=None,
-        user=None,
-        user_id=None,
-        limit=None,
-        is_top=None,
-        latest=None,
-        search=None,
-    ):
-        projects = cls.getAcceptedProjects()
-        if user and user.is_staff:
-            projects = cls.objects.all()
-        else:
-            if user_id:
-                projects = cls.getUserProjects(user_id)
-
-        if is_featured == "true":
-            projects = cls.getAcceptedProjects().filter(is_featured=True)
-
-        if tags:
-            projects = cls.getAcceptedProjects().filter(tags__name__in=tags.split(","))
-
-        if search:
-            projects = cls.getAcceptedProjects().filter(
-                models.Q(title__icontains=search) | models.Q(details__icontains=search)
-            )
+        return cls.getAvtiveProjects().order_by("-rating_average")[:limit]
 
-        if latest == "true":
-            if limit:
-                try:
-                    limit = int(limit)
-                    projects = cls.getAcceptedProjects().order_by("-created_at")[:limit]
-                except (ValueError, TypeError):
-                    pass
-            else:
-                projects = cls.getAcceptedProjects().order_by("-created_at")[:5]
+    @classmethod
+    def getProjectsShowingUser(cls, user_id):
+        """Projects whose detail or feeds nest the user
+
+        Owned, commented on, rated or donated to.
+        """
+        children = [
+            model.objects.filter(user_id=user_id).values("project_id")
+            for model in (Comments, Ratting, Donation)
+        ]
+        return cls.objects.filter(
+            models.Q(user_id=user_id)
+            | models.Q(pk__in=children[0])
+            | models.Q(pk__in=children[1])
+            | models.Q(pk__in=children[2])
+        )
 
-        if limit:
-            try:
-                limit = int(limit)
-                projects = cls.getAcceptedProjects()[:limit]
-            except (ValueError, TypeError):
-                pass
+    @classmethod
+    def touchAll(cls, projects):
+        """``touch`` every project of the queryset"""
+        return projects.update(
+            version=models.F("version") + 1, updated_at=timezone.now()
+        )
 
-        if is_top == "true":
-            return cls.getTopRatedProjects()
+    @classmethod
+    def withStats(cls, projects):
+        """Load everything the list serializers need in a constant number of queries"""
+        return cls.withPendingFunding(
+            projects.select_related("category").prefetch_related("tags")
+        )
 
-        return projects
+    @classmethod
+    def withPendingFunding(cls, projects):
+        """Annotate the donation deltas still held in the counter shards"""
+        return projects.annotate(**DonationCounterShard.pendingFunding("pk"))
+
+    @classmethod
+    def filterProjects(cls, **filters):
+        """Combine the project list filters into a single queryset
+
+        See ``projects.filters.ProjectFilter`` for the supported filters.
+        """
+        from .filters import ProjectFilter
+
+        return ProjectFilter(**filters).queryset()
 
     def canBeCanceld(self):
-        if not self.get_total_donations() or not self.total_target:
+        donations_total, _ = self.get_funding()
+        if not donations_total or not self.total_target:
             return True
-        return self.get_total_donations() / self.total_target * 100 < 25
+        return donations_total / self.total_target * 100 < 25
+
+    def get_funding(self):
+        """Return (total raised, backers) including the unfolded shard deltas"""
+        if not hasattr(self, "pending_amount"):
+            pending = self.counter_shards.aggregate(
+                amount=models.Sum("amount"), donors=models.Sum("donors")
+            )
+            self.pending_amount = pending["amount"] or Decimal("0.00")
+            self.pending_donors = pending["donors"] or 0
+        return (
+            self.donations_total + self.pending_amount,
+            self.donors_count + self.pending_donors,
+        )
 
     def get_average_rating(self):
         average = self.ratings.aggregate(avg_ratings=models.Avg("rate"))["avg_ratings"]
@@ -141,7 +220,91 @@ class Project(models.Model):
         return self.ratings.count()
 
     def get_donors_count(self):
-        return self.donations.values("user").distinct().count()
+        return self.donations.exclude(user=None).values("user").distinct().count()
+
+    @classmethod
+    def touch(cls, project_id):
+        """Record a change to the project or one of its children"""
+        cls.objects.filter(pk=project_id).update(
+            version=models.F("version") + 1, updated_at=timezone.now()
+        )
+
+    @classmethod
+    def adjust_funding(cls, project_id, amount, donors=0):
+        """Move the stored funding counters of a project by the given deltas"""
+        cls.objects.filter(pk=project_id).update(
+            donations_total=models.F("donations_total") + amount,
+            donors_count=models.F("donors_count") + donors,
+            version=models.F("version") + 1,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def add_donation(cls, donation):
+        """Record a newly created donation in one of the project's counter shards"""
+        first_from_user = (
+            donation.user_id is not None
+            and not Donation.objects.filter(
+                project_id=donation.project_id, user_id=donation.user_id
+            )
+            .exclude(pk=donation.pk)
+            .exists()
+        )
+        DonationCounterShard.add(
+            donation.project_id, donation.amount, int(first_from_user)
+        )
+
+    @classmethod
+    def remove_donation(cls, donation, donor_removed=False):
+        """Take a deleted donation back out of the stored funding counters
+
+        ``donor_removed`` tells that the same delete already took the donor
+        out of the backers, with another of their donations to the project.
+        """
+        # Fold first, the backer being removed may still sit in a shard
+        DonationCounterShard.fold([donation.project_id])
+        last_from_user = (
+            not donor_removed
+            and donation.user_id is not None
+            and not Donation.objects.filter(
+                project_id=donation.project_id, user_id=donation.user_id
+            ).exists()
+        )
+        cls.adjust_funding(
+            donation.project_id, -donation.amount, -int(last_from_user)
+        )
+
+    @classmethod
+    def add_rating(cls, rating):
+        """Fold a newly created rating into the stored rating aggregates"""
+        rating_sum = models.F("rating_sum") + rating.rate
+        rating_count = models.F("rating_count") + 1
+        cls.objects.filter(pk=rating.project_id).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating_average=Cast(rating_sum, models.FloatField()) / rating_count,
+            version=models.F("version") + 1,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def remove_rating(cls, rating):
+        """Take a deleted rating back out of the stored rating aggregates"""
+        rating_sum = models.F("rating_sum") - rating.rate
+        rating_count = models.F("rating_count") - 1
+        cls.objects.filter(pk=rating.project_id).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating_average=models.Case(
+                models.When(
+                    rating_count__gt=1,
+                    then=Cast(rating_sum, models.FloatField()) / rating_count,
+                ),
+                default=0.0,
+            ),
+            version=models.F("version") + 1,
+            updated_at=timezone.now(),
+        )
 
     @classmethod
     def get_total_money_raised(cls):
@@ -154,17 +317,183 @@ class Project(models.Model):
         return total or 0
 
 
+class PlatformStatistics(models.Model):
+    """Site-wide totals returned with every paginated project list.
+
+    Kept as a single row that is adjusted incrementally on donation and
+    project writes, so reading the statistics is one primary key lookup.
+    """
+
+    SINGLETON_PK = 1
+
+    total_money_raised = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00")
+    )
+    total_active_projects = models.PositiveIntegerField(default=0)
+    total_featured = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "Platform statistics"
+
+    @classmethod
+    def compute(cls):
+        """Compute the statistics from the source tables
+
+        Donations still held in the counter shards are left out, they are
+        added when the shards are folded.
+        """
+        pending = DonationCounterShard.objects.aggregate(total=models.Sum("amount"))
+        raised = Decimal(Project.get_total_money_raised()) - (pending["total"] or 0)
+        return {
+            # computed sums come back unrounded from SQLite
+            "total_money_raised": raised.quantize(Decimal("0.01")),
+            "total_active_projects": Project.objects.filter(is_active=True).count(),
+            "total_featured": Project.objects.filter(is_featured=True).count(),
+        }
+
+    @classmethod
+    def rebuild(cls):
+        stats, _ = cls.objects.update_or_create(
+            pk=cls.SINGLETON_PK, defaults=cls.compute()
+        )
+        return stats
+
+    @classmethod
+    def get(cls):
+        """The statistics, with donations not yet folded from the counter shards"""
+        pending = (
+            DonationCounterShard.objects.annotate(group=models.Value(1))
+            .values("group")
+            .annotate(total=models.Sum("amount"))
+            .values("total")
+        )
+        stats = (
+            cls.objects.filter(pk=cls.SINGLETON_PK)
+            .annotate(pending_money_raised=models.Subquery(pending))
+            .first()
+        )
+        if stats is None:
+            cls.rebuild()
+            return cls.get()
+        stats.total_money_raised += stats.pending_money_raised or 0
+        return stats
+
+    @classmethod
+    def adjust(cls, **deltas):
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_PK).update(
+            updated_at=timezone.now(),
+            **{field: models.F(field) + delta for field, delta in deltas.items()},
+        )
+        if not updated:
+            # First write ever: the source tables already include this change
+            cls.rebuild()
+
+
 class ProjectImages(models.Model):
     project = models.ForeignKey(
         Project, on_delete=models.CASCADE, related_name="images"
     )
-    image = models.ImageField(upload_to="images/")
+    image = models.ImageField(
+        upload_to="images/", storage=get_content_addressed_storage
+    )
+    # Resized copies of the image, written by the image worker
+    variants = models.JSONField(default=dict, blank=True)
+    # SHA-256 of the uploaded bytes, so re-uploads of an image are skipped
+    content_hash = models.CharField(max_length=64, blank=True)
+    position = models.PositiveIntegerField(default=0)
     title = models.CharField(max_length=100, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.title or f"Image {self.id}"
 
+    class Meta:
+        ordering = ["position", "id"]
+        indexes = [
+            models.Index(
+                fields=["project", "content_hash"], name="image_project_hash_idx"
+            ),
+        ]
+
+    @classmethod
+    def filterByKeys(cls, project, keys):
+        """Images of the project matching ids or content hashes"""
+        ids = [int(key) for key in keys if str(key).isdigit()]
+        hashes = [key for key in keys if not str(key).isdigit()]
+        return cls.objects.filter(project=project).filter(
+            models.Q(pk__in=ids) | models.Q(content_hash__in=hashes)
+        )
+
+    @classmethod
+    def add_images(cls, project, files):
+        """Append uploaded files to the gallery, skipping images it already has"""
+        gallery = cls.objects.filter(project=project)
+        known = set(gallery.values_list("content_hash", flat=True))
+        position = (gallery.aggregate(last=models.Max("position"))["last"] or 0) + 1
+        new_images = []
+        for upload in files:
+            content_hash = images.content_hash(upload)
+            if content_hash in known:
+                continue
+            known.add(content_hash)
+            new_images.append(
+                cls(
+                    project=project,
+                    image=upload,
+                    content_hash=content_hash,
+                    position=position + len(new_images),
+                )
+            )
+        if not new_images:
+            return []
+        # bulk_create sends no post_save, so do what its handler does here
+        created = cls.objects.bulk_create(new_images)
+        MediaBlob.retain([image.image.name for image in created])
+        for image in created:
+            images.queue(images.process_gallery_image, image.pk)
+        cls.gallery_changed(project.pk)
+        return created
+
+    @classmethod
+    def remove_images(cls, project, keys):
+        """Delete gallery images by id or content hash"""
+        return cls.filterByKeys(project, keys).delete()[0]
+
+    @classmethod
+    def reorder(cls, project, keys):
+        """Move the given images to the front, in the given order"""
+        listed = {}
+        for image in cls.filterByKeys(project, keys):
+            listed[str(image.pk)] = listed[image.content_hash] = image
+        ordered = []
+        for key in map(str, keys):
+            if key in listed and listed[key] not in ordered:
+                ordered.append(listed[key])
+        ordered += [
+            image
+            for image in cls.objects.filter(project=project)
+            if image not in ordered
+        ]
+        changed = []
+        for position, image in enumerate(ordered, 1):
+            if image.position != position:
+                image.position = position
+                changed.append(image)
+        if changed:
+            cls.objects.bulk_update(changed, ["position"])
+            cls.gallery_changed(project.pk)
+        return len(changed)
+
+    @classmethod
+    def gallery_changed(cls, project_id):
+        """What the child signals do, for bulk writes that send none"""
+        Project.touch(project_id)
+        project_cache.invalidate_project(project_id, listing=False)
+
 
 class Ratting(models.Model):
     project = models.ForeignKey(
@@ -186,6 +515,23 @@ class Ratting(models.Model):
     def __str__(self):
         return f"{self.user} rate {self.project}"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "created_at", "id"],
+                name="rating_project_created_idx",
+            ),
+        ]
+
+    @classmethod
+    def getProjectFeed(cls, project):
+        """Newest first, served by the (project, created_at, id) index"""
+        return (
+            cls.objects.filter(project=project)
+            .select_related("user")
+            .order_by("-created_at", "-id")
+        )
+
 
 class Comments(models.Model):
     project = models.ForeignKey(
@@ -202,6 +548,21 @@ class Comments(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["project", "created_at", "id"],
+                name="comment_project_created_idx",
+            ),
+        ]
+
+    @classmethod
+    def getProjectFeed(cls, project):
+        """Newest first, served by the (project, created_at, id) index"""
+        return (
+            cls.objects.filter(project=project)
+            .select_related("user")
+            .order_by("-created_at", "-id")
+        )
 
 
 class Donation(models.Model):
@@ -219,10 +580,289 @@ class Donation(models.Model):
     def __str__(self):
         return f"{self.user} donted to ${self.project}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="donation_created_idx"),
+            models.Index(
+                fields=["project", "created_at", "id"],
+                name="donation_project_created_idx",
+            ),
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="donation_user_created_idx",
+            ),
+        ]
+
     @classmethod
     def getUserDonations(cls, user):
         return cls.objects.filter(user=user)
 
+    @classmethod
+    def withSummaries(cls, donations):
+        """Load what the donation list serializers need in a fixed number of queries"""
+        pending = DonationCounterShard.pendingFunding("project")
+        return donations.select_related("user", "project__category").annotate(
+            project_pending_amount=pending["pending_amount"],
+            project_pending_donors=pending["pending_donors"],
+        )
+
+
+class DonationCounterShard(models.Model):
+    """One of several rows accumulating new donations to a project.
+
+    Each donation updates a randomly picked shard instead of the project row,
+    so concurrent donations to a popular project rarely wait on each other.
+    Readers add the shards to the project counters, and ``fold`` periodically
+    moves them into the project row (run ``manage.py fold_counters``).
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="counter_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00")
+    )
+    donors = models.IntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "shard"], name="counter_shard_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}#{self.shard}: {self.amount}"
+
+    @classmethod
+    def pendingFunding(cls, project_ref):
+        """Annotations summing the shards of the project at ``project_ref``"""
+        shards = cls.objects.filter(project=models.OuterRef(project_ref)).values(
+            "project"
+        )
+        return {
+            "pending_amount": Coalesce(
+                models.Subquery(
+                    shards.annotate(total=models.Sum("amount")).values("total")
+                ),
+                Decimal("0.00"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            "pending_donors": Coalesce(
+                models.Subquery(
+                    shards.annotate(total=models.Sum("donors")).values("total")
+                ),
+                0,
+            ),
+        }
+
+    @classmethod
+    def add(cls, project_id, amount, donors=0, shards=None):
+        """Add a donation to a random shard of the project"""
+        shard = random.randrange(shards or settings.DONATION_COUNTER_SHARDS)
+        row = cls.objects.filter(project_id=project_id, shard=shard)
+        now = timezone.now()
+        changes = {
+            "amount": models.F("amount") + amount,
+            "donors": models.F("donors") + donors,
+            "count": models.F("count") + 1,
+            "updated_at": now,
+        }
+        if row.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    project_id=project_id,
+                    shard=shard,
+                    amount=amount,
+                    donors=donors,
+                    count=1,
+                    updated_at=now,
+                )
+        except IntegrityError:
+            # another writer created the shard first
+            row.update(**changes)
+
+    @classmethod
+    def fold(cls, project_ids=None):
+        """Move the shard deltas into the project counters and statistics
+
+        Returns the number of projects folded.
+        """
+        shards = cls.objects.all()
+        if project_ids is not None:
+            shards = shards.filter(project_id__in=project_ids)
+        per_project = defaultdict(lambda: [Decimal("0.00"), 0])
+        with transaction.atomic():
+            for shard in shards.select_for_update():
+                folded = cls.objects.filter(pk=shard.pk, count=shard.count)
+                if not folded.delete()[0]:
+                    # written to since it was read, keep the newer deltas
+                    cls.objects.filter(pk=shard.pk).update(
+                        amount=models.F("amount") - shard.amount,
+                        donors=models.F("donors") - shard.donors,
+                        count=models.F("count") - shard.count,
+                    )
+                totals = per_project[shard.project_id]
+                totals[0] += shard.amount
+                totals[1] += shard.donors
+            for project_id, (amount, donors) in per_project.items():
+                Project.adjust_funding(project_id, amount, donors)
+            DonationBucket.fold(project_ids)
+            PlatformStatistics.adjust(
+                total_money_raised=sum(totals[0] for totals in per_project.values())
+            )
+        return len(per_project)
+
+
+class DonationBucket(models.Model):
+    """Donations to a project over one fixed time slot.
+
+    Buckets are updated as donations arrive, so the trending feed sums a
+    handful of rows per project instead of scanning the donations table.
+    Like the counter shards, each donation updates one of several rows of
+    its bucket, and ``DonationCounterShard.fold`` merges them into the
+    bucket's ``FOLDED`` row.
+    """
+
+    BUCKET_SECONDS = 10 * 60
+    WINDOWS = {
+        "1h": timedelta(hours=1),
+        "24h": timedelta(hours=24),
+        "7d": timedelta(days=7),
+    }
+    DEFAULT_WINDOW = "24h"
+    FOLDED = 0
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="donation_buckets"
+    )
+    bucket_start = models.DateTimeField()
+    # FOLDED, or 1 to DONATION_COUNTER_SHARDS for deltas not folded yet
+    shard = models.PositiveSmallIntegerField(default=FOLDED)
+    amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00")
+    )
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "bucket_start", "shard"],
+                name="donation_bucket_shard_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["bucket_start", "project"], name="donation_bucket_start_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} @ {self.bucket_start}#{self.shard}: {self.amount}"
+
+    @classmethod
+    def bucket_for(cls, moment):
+        timestamp = int(moment.timestamp())
+        return datetime.fromtimestamp(
+            timestamp - timestamp % cls.BUCKET_SECONDS, tz=dt_timezone.utc
+        )
+
+    @classmethod
+    def window_start(cls, window):
+        span = cls.WINDOWS.get(window, cls.WINDOWS[cls.DEFAULT_WINDOW])
+        return cls.bucket_for(timezone.now() - span)
+
+    @classmethod
+    def record(cls, project_id, moment, amount, count=1, shard=None):
+        """Add ``amount``/``count`` to a random shard of the bucket of ``moment``"""
+        if shard is None:
+            shard = random.randint(1, settings.DONATION_COUNTER_SHARDS)
+        bucket = cls.objects.filter(
+            project_id=project_id, bucket_start=cls.bucket_for(moment), shard=shard
+        )
+        changes = {
+            "amount": models.F("amount") + amount,
+            "count": models.F("count") + count,
+        }
+        if bucket.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    project_id=project_id,
+                    bucket_start=cls.bucket_for(moment),
+                    shard=shard,
+                    amount=amount,
+                    count=count,
+                )
+        except IntegrityError:
+            # another writer created the bucket first
+            bucket.update(**changes)
+
+    @classmethod
+    def fold(cls, project_ids=None):
+        """Merge the shards of each bucket into its ``FOLDED`` row
+
+        Called by ``DonationCounterShard.fold``, in its transaction.
+        """
+        shards = cls.objects.exclude(shard=cls.FOLDED)
+        if project_ids is not None:
+            shards = shards.filter(project_id__in=project_ids)
+        per_bucket = defaultdict(lambda: [Decimal("0.00"), 0])
+        for shard in shards.select_for_update():
+            folded = cls.objects.filter(
+                pk=shard.pk, amount=shard.amount, count=shard.count
+            )
+            if not folded.delete()[0]:
+                # written to since it was read, keep the newer deltas
+                cls.objects.filter(pk=shard.pk).update(
+                    amount=models.F("amount") - shard.amount,
+                    count=models.F("count") - shard.count,
+                )
+            totals = per_bucket[shard.project_id, shard.bucket_start]
+            totals[0] += shard.amount
+            totals[1] += shard.count
+        for (project_id, bucket_start), (amount, count) in per_bucket.items():
+            cls.record(project_id, bucket_start, amount, count, shard=cls.FOLDED)
+
+    @classmethod
+    def retention_start(cls):
+        return cls.bucket_for(timezone.now() - max(cls.WINDOWS.values()))
+
+    @classmethod
+    def prune(cls):
+        """Drop buckets older than the longest window"""
+        return cls.objects.filter(bucket_start__lt=cls.retention_start()).delete()[0]
+
+    @classmethod
+    def annotateTrending(cls, projects, window=None):
+        """Annotate and filter projects by donations within the window"""
+        start = cls.window_start(window)
+        # summed over the shards, a deletion may sit in another shard
+        active = (
+            cls.objects.filter(bucket_start__gte=start)
+            .values("project")
+            .annotate(donations=models.Sum("count"))
+            .filter(donations__gt=0)
+            .values("project")
+        )
+        recent = cls.objects.filter(
+            project=models.OuterRef("pk"), bucket_start__gte=start
+        ).values("project")
+        return projects.filter(pk__in=active).annotate(
+            trending_amount=models.Subquery(
+                recent.annotate(total=models.Sum("amount")).values("total")
+            ),
+            trending_count=models.Subquery(
+                recent.annotate(total=models.Sum("count")).values("total")
+            ),
+        )
+
 
 class CommentsReports(models.Model):
     user = models.ForeignKey(
@@ -250,3 +890,68 @@ class ProjectsReports(models.Model):
 
     def __str__(self):
         return f"{self.user} reported ${self.project}"
+
+
+class MediaBlob(models.Model):
+    """A file in the content-addressed media storage.
+
+    ``references`` counts the model rows pointing at the file, blobs that
+    stayed unreferenced for a while are deleted by ``manage.py gc_media``.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.IntegerField(default=0)
+    # last save or reference change, unreferenced blobs get a grace period
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["references", "updated_at"], name="media_blob_gc_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.references})"
+
+    @classmethod
+    def register(cls, name, size):
+        """Record a stored blob, or refresh it when the bytes were known"""
+        if cls.objects.filter(name=name).update(size=size, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, size=size)
+        except IntegrityError:
+            cls.objects.filter(name=name).update(updated_at=timezone.now())
+
+    @classmethod
+    def adjust_references(cls, names, delta):
+        from .storage import is_blob_name
+
+        counts = defaultdict(int)
+        for name in names:
+            if is_blob_name(name):
+                counts[name] += delta
+        now = timezone.now()
+        for name, change in counts.items():
+            updated = cls.objects.filter(name=name).update(
+                references=models.F("references") + change, updated_at=now
+            )
+            if not updated and change > 0:
+                # stored before it was tracked
+                cls.objects.get_or_create(name=name, defaults={"references": change})
+
+    @classmethod
+    def retain(cls, names):
+        cls.adjust_references(names, 1)
+
+    @classmethod
+    def release(cls, names):
+        cls.adjust_references(names, -1)
+
+    @classmethod
+    def collectable(cls, grace):
+        """Blobs nothing has referenced for at least ``grace``"""
+        return cls.objects.filter(
+            references__lte=0, updated_at__lt=timezone.now() - grace
+        )
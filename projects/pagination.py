@@ -0,0 +1,85 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from .models import PlatformStatistics
+
+
+MAX_PAGE_SIZE = 100
+
+
+class SizedPageNumberPagination(PageNumberPagination):
+    """Page number pagination taking the page size from ``?page_size=``"""
+
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination on (created_at, id), newest first.
+
+    Clients opt in by sending ``?cursor=`` (empty for the first page) and
+    then follow the ``next``/``previous`` links. Pages are constant time and
+    no ``COUNT(*)`` is issued, so ``count`` is always ``null``.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": None,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+def keeps_ordering(queryset, ordering):
+    """Whether sorting ``queryset`` by ``ordering`` leaves its order as is"""
+    query = queryset.query
+    if query.extra_order_by:
+        return False
+    return tuple(query.order_by) in ((), tuple(ordering))
+
+
+def get_paginator(
+    request,
+    queryset,
+    pagination_class=SizedPageNumberPagination,
+    cursor_pagination_class=CreatedAtCursorPagination,
+):
+    """Pick keyset pagination when the client asked for it with ``?cursor=``
+
+    Keyset pages are always newest first, so a queryset sorted any other way
+    (by funding, trending, search relevance...) keeps page numbers instead of
+    being silently re-sorted.
+    """
+    if (
+        CreatedAtCursorPagination.cursor_query_param in request.query_params
+        and not queryset.query.is_sliced
+        and keeps_ordering(queryset, cursor_pagination_class.ordering)
+    ):
+        return cursor_pagination_class()
+    return pagination_class()
+
+
+class StatisticsPaginationMixin:
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        stats = PlatformStatistics.get()
+        response.data["statistics"] = {
+            "total_money_raised": stats.total_money_raised,
+            "total_active_projects": stats.total_active_projects,
+            "total_featured": stats.total_featured,
+        }
+        return response
+
+
+class CustomPagination(StatisticsPaginationMixin, SizedPageNumberPagination):
+    pass
+
+
+class ProjectCursorPagination(StatisticsPaginationMixin, CreatedAtCursorPagination):
+    pass
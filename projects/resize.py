@@ -0,0 +1,208 @@
+"""On-demand resized renditions of any image under ``MEDIA_ROOT``.
+
+``/media/resize/<w>x<h>/<path>`` fits the image in the box (or fills it with
+``?fit=cover``) and re-encodes it as WebP or JPEG. Renditions are kept in a
+disk cache of at most ``IMAGE_RESIZE_CACHE_BYTES``, evicting the least
+recently served first. Only the boxes in ``IMAGE_RESIZE_SIZES`` are served.
+API clients get these URLs by sending ``?image_size=<w>x<h>``.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from io import BytesIO
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.http import require_GET
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .storage import is_blob_name
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+FITS = ("contain", "cover")
+SIZE_PATTERN = re.compile(r"^(\d{1,5})x(\d{1,5})$")
+# Evict down to this share of the budget, so a full cache is not scanned
+# again on every new rendition
+EVICT_TO = 0.9
+
+
+def valid_size(width, height):
+    return (width, height) in {tuple(size) for size in settings.IMAGE_RESIZE_SIZES}
+
+
+def requested_size(request):
+    """The ``?image_size=<w>x<h>`` of an API request, if valid"""
+    match = SIZE_PATTERN.match(request.GET.get("image_size", ""))
+    if match is None:
+        return None
+    width, height = int(match[1]), int(match[2])
+    return (width, height) if valid_size(width, height) else None
+
+
+def resize_url(name, width, height):
+    return reverse(
+        "media-resize", kwargs={"width": width, "height": height, "path": name}
+    )
+
+
+def image_url(request, field_file, default_url=None):
+    """Absolute URL of an image, resized when the request asks for a size"""
+    size = requested_size(request) if request else None
+    if size:
+        url = resize_url(field_file.name, *size)
+    else:
+        url = default_url or field_file.url
+    return request.build_absolute_uri(url) if request else url
+
+
+def negotiate_format(request):
+    """Return the output format and whether it depends on ``Accept``"""
+    requested = request.GET.get("format")
+    if requested in FORMATS:
+        return requested, False
+    accepts_webp = "image/webp" in request.headers.get("Accept", "")
+    return ("webp" if accepts_webp else "jpeg"), True
+
+
+def cache_key(name, modified, width, height, fit, output_format):
+    source = f"{name}\0{modified}\0{width}x{height}\0{fit}\0{output_format}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def render(source, width, height, fit, output_format):
+    pil_format = FORMATS[output_format][0]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if fit == "cover":
+            image = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+        else:
+            image.thumbnail((width, height), Image.Resampling.LANCZOS)
+        if pil_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        output = BytesIO()
+        image.save(output, pil_format, quality=settings.IMAGE_VARIANT_QUALITY)
+    return output.getvalue()
+
+
+def evict(root):
+    """Delete the least recently served renditions once over budget
+
+    Returns the bytes left in the cache.
+    """
+    entries = []
+    for entry in os.scandir(root):
+        if entry.is_file() and not entry.name.startswith("."):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    budget = settings.IMAGE_RESIZE_CACHE_BYTES
+    if total <= budget:
+        return total
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= budget * EVICT_TO:
+            break
+    return total
+
+
+class CacheUsage:
+    """Running total of the cache's bytes, so only an overflow scans the cache
+
+    The total starts from one scan of the directory and then counts this
+    process' writes. Renditions written by other processes are picked up by
+    the scan of the next eviction.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.root = None
+        self.total = 0
+
+    def add(self, root, size):
+        with self.lock:
+            if root != self.root:
+                # the first write, or the cache root was changed
+                self.root = root
+                self.total = evict(root)
+            else:
+                self.total += size
+            if self.total > settings.IMAGE_RESIZE_CACHE_BYTES:
+                self.total = evict(root)
+
+
+usage = CacheUsage()
+
+
+def store(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write under a temporary name, readers never see a partial file
+    handle, temporary = tempfile.mkstemp(dir=path.parent, prefix=".")
+    with os.fdopen(handle, "wb") as output:
+        output.write(data)
+    os.replace(temporary, path)
+    usage.add(path.parent, len(data))
+
+
+def read_cached(path):
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    # the modification time is the recency used for eviction
+    os.utime(path)
+    return data
+
+
+@require_GET
+def resize_image(request, width, height, path):
+    if not valid_size(width, height):
+        return HttpResponseBadRequest("Unsupported size")
+    fit = request.GET.get("fit", "contain")
+    if fit not in FITS:
+        return HttpResponseBadRequest("Unsupported fit")
+    try:
+        modified = default_storage.get_modified_time(path).timestamp()
+    except (OSError, SuspiciousFileOperation):
+        raise Http404("No image matches the given path.")
+
+    output_format, negotiated = negotiate_format(request)
+    key = cache_key(path, modified, width, height, fit, output_format)
+    etag = f'"{key}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        cached = Path(settings.IMAGE_RESIZE_CACHE_ROOT) / f"{key}.{output_format}"
+        data = read_cached(cached)
+        if data is None:
+            try:
+                with default_storage.open(path, "rb") as source:
+                    data = render(source, width, height, fit, output_format)
+            except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+                raise Http404("No image matches the given path.")
+            store(cached, data)
+        response = HttpResponse(data, content_type=FORMATS[output_format][1])
+        response["ETag"] = etag
+
+    if is_blob_name(path):
+        # the name holds the digest of the content, it never changes
+        cache_control = f"public, max-age={settings.IMAGE_RESIZE_MAX_AGE}, immutable"
+    else:
+        cache_control = f"public, max-age={settings.IMAGE_RESIZE_MUTABLE_MAX_AGE}"
+    response["Cache-Control"] = cache_control
+    if negotiated:
+        patch_vary_headers(response, ["Accept"])
+    return response
@@ -0,0 +1,127 @@
+"""Full-text search over projects.
+
+On SQLite the title, details, tag names and category title of every project
+are indexed in an FTS5 virtual table whose rowid is the project id, and
+matches are ranked with bm25. Other databases fall back to ``icontains``.
+"""
+
+import re
+from django.db import connection, models
+
+FTS_TABLE = "projects_project_fts"
+
+# bm25 column weights, in the order of the FTS table columns
+COLUMN_WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+CREATE_FTS_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, details, tags, category, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_FTS_TABLE = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+POPULATE_FTS_TABLE = f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, details, tags, category)
+    SELECT
+        project.id,
+        project.title,
+        project.details,
+        COALESCE((
+            SELECT group_concat(tag.name, ' ')
+            FROM taggit_taggeditem AS item
+            JOIN taggit_tag AS tag ON tag.id = item.tag_id
+            JOIN django_content_type AS ct ON ct.id = item.content_type_id
+            WHERE ct.app_label = 'projects'
+                AND ct.model = 'project'
+                AND item.object_id = project.id
+        ), ''),
+        COALESCE(category.title, '')
+    FROM projects_project AS project
+    LEFT JOIN projects_category AS category ON category.id = project.category_id
+"""
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == "sqlite"
+
+
+def match_expression(text):
+    """Turn free text into an FTS5 query matching every word as a prefix"""
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _document(project):
+    return (
+        project.pk,
+        project.title,
+        project.details,
+        " ".join(project.tags.names()),
+        project.category.title if project.category_id else "",
+    )
+
+
+def index_project(project):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [project.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, details, tags, category) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            _document(project),
+        )
+
+
+def remove_project(project_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [project_id])
+
+
+def set_category_title(category_id, title):
+    """Refresh the category column of every project filed under a category"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET category = %s WHERE rowid IN "
+            "(SELECT id FROM projects_project WHERE category_id = %s)",
+            [title, category_id],
+        )
+
+
+def rebuild():
+    """Re-create the index from the projects table, returns the indexed count"""
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(DROP_FTS_TABLE)
+        cursor.execute(CREATE_FTS_TABLE)
+        cursor.execute(POPULATE_FTS_TABLE)
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def search_projects(projects, text):
+    """Restrict ``projects`` to those matching ``text``, best matches first"""
+    if not is_supported():
+        return projects.filter(
+            models.Q(title__icontains=text) | models.Q(details__icontains=text)
+        )
+
+    expression = match_expression(text)
+    if not expression:
+        return projects.none()
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    project_table = projects.model._meta.db_table
+    return projects.extra(
+        select={"search_rank": f"bm25({FTS_TABLE}, {weights})"},
+        tables=[FTS_TABLE],
+        where=[
+            f"{FTS_TABLE}.rowid = {project_table}.id",
+            f"{FTS_TABLE} MATCH %s",
+        ],
+        params=[expression],
+        order_by=["search_rank"],
+    )
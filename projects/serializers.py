@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import (
     Project,
@@ -11,6 +12,7 @@ from .models import (
 )
 from taggit.serializers import TagListSerializerField, TaggitSerializer
 from accounts.serializers import UserSerializer
+from . import images, resize
 
 
 class ImageSerializer(serializers.ModelSerializer):
@@ -18,14 +20,15 @@ class ImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProjectImages
-        fields = ["id", "image_url", "title", "uploaded_at"]
-        read_only_fields = ["id", "uploaded_at"]
+        fields = ["id", "image_url", "title", "position", "content_hash", "uploaded_at"]
+        read_only_fields = ["id", "position", "content_hash", "uploaded_at"]
 
     def get_image_url(self, obj):
-        request = self.context.get("request")
-        if request:
-            return request.build_absolute_uri(obj.image.url)
-        return obj.image.url
+        return resize.image_url(
+            self.context.get("request"),
+            obj.image,
+            images.variant_url(obj.image, obj.variants, "gallery"),
+        )
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -152,22 +155,23 @@ class ProjectDetailSerializer(TaggitSerializer, serializers.ModelSerializer):
         ]
 
     def get_total_donations(self, obj):
-        return obj.get_total_donations()
+        return obj.get_funding()[0]
 
     def get_thumbnail(self, obj):
-        request = self.context.get("request")
-        if request:
-            return request.build_absolute_uri(obj.thumbnail.url)
-        return obj.thumbnail.url
+        return resize.image_url(
+            self.context.get("request"),
+            obj.thumbnail,
+            images.variant_url(obj.thumbnail, obj.thumbnail_variants, "detail"),
+        )
 
     def get_backers_count(self, obj):
-        return obj.get_donors_count()
+        return obj.get_funding()[1]
 
     def get_review_count(self, obj):
-        return obj.get_raters_count()
+        return obj.rating_count
 
     def get_rating(slef, obj):
-        return obj.get_average_rating()
+        return round(obj.rating_average, 1)
 
 
 class ProjectStoreSerializer(TaggitSerializer, serializers.ModelSerializer):
@@ -176,6 +180,13 @@ class ProjectStoreSerializer(TaggitSerializer, serializers.ModelSerializer):
         write_only=True,
         required=False,
     )
+    # gallery images to drop and the new gallery order, by id or content hash
+    remove_images = serializers.ListField(
+        child=serializers.CharField(), write_only=True, required=False
+    )
+    image_order = serializers.ListField(
+        child=serializers.CharField(), write_only=True, required=False
+    )
 
     tags = TagListSerializerField(required=True)
     rating = serializers.SerializerMethodField()
@@ -194,6 +205,8 @@ class ProjectStoreSerializer(TaggitSerializer, serializers.ModelSerializer):
             "title",
             "details",
             "images",
+            "remove_images",
+            "image_order",
             "total_target",
             "start_time",
             "end_time",
@@ -222,22 +235,23 @@ class ProjectStoreSerializer(TaggitSerializer, serializers.ModelSerializer):
         ]
 
     def get_rating(slef, obj):
-        return obj.get_average_rating()
+        return round(obj.rating_average, 1)
 
     def get_total_donations(self, obj):
-        return obj.get_total_donations()
+        return obj.get_funding()[0]
 
     def get_thumbnail_url(self, obj):
-        request = self.context.get("request")
-        if request:
-            return request.build_absolute_uri(obj.thumbnail.url)
-        return obj.thumbnail.url
+        return resize.image_url(
+            self.context.get("request"),
+            obj.thumbnail,
+            images.variant_url(obj.thumbnail, obj.thumbnail_variants, "card"),
+        )
 
     def get_backers_count(self, obj):
-        return obj.get_donors_count()
+        return obj.get_funding()[1]
 
     def get_review_count(self, obj):
-        return obj.get_raters_count()
+        return obj.rating_count
 
     def validate_title(self, value):
         if len(value) < 5:
@@ -288,49 +302,88 @@ class ProjectStoreSerializer(TaggitSerializer, serializers.ModelSerializer):
     def create(self, validated_data):
         images_data = validated_data.pop("images", None)
         tags_data = validated_data.pop("tags", [])
-        project = Project.objects.create(**validated_data)
+        validated_data.pop("remove_images", None)
+        validated_data.pop("image_order", None)
+        with transaction.atomic():
+            project = Project.objects.create(**validated_data)
 
-        if tags_data:
-            project.tags.set(tags_data)
+            if tags_data:
+                project.tags.set(tags_data)
 
-        if images_data:
-            for image_data in images_data:
-                ProjectImages.objects.create(project=project, image=image_data)
+            if images_data:
+                ProjectImages.add_images(project, images_data)
 
         return project
 
     def update(self, instance, validated_data):
         images_data = validated_data.pop("images", None)
         tags_data = validated_data.pop("tags", None)
+        remove_images = validated_data.pop("remove_images", None)
+        image_order = validated_data.pop("image_order", None)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        instance.save()
+        with transaction.atomic():
+            instance.save()
 
-        if tags_data is not None:
-            instance.tags.set(tags_data)
+            if tags_data is not None:
+                instance.tags.set(tags_data)
 
-        if (
-            images_data is not None and images_data
-        ):  # Only modify images if data was provided
-            instance.images.all().delete()
-
-            for image_data in images_data:
-                ProjectImages.objects.create(project=instance, image=image_data)
+            # Only the images named or uploaded are touched, uploads the
+            # gallery already has are skipped
+            if remove_images:
+                ProjectImages.remove_images(instance, remove_images)
+            if images_data:
+                ProjectImages.add_images(instance, images_data)
+            if image_order:
+                ProjectImages.reorder(instance, image_order)
 
         return instance
 
 
+class ProjectSummarySerializer(serializers.ModelSerializer):
+    """The few project fields shown next to each donation"""
+
+    category = serializers.CharField(source="category.title", default=None)
+    thumbnail = serializers.SerializerMethodField()
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Project
+        fields = ["id", "title", "category", "thumbnail", "progress"]
+        read_only_fields = fields
+
+    def get_thumbnail(self, obj):
+        return resize.image_url(
+            self.context.get("request"),
+            obj.thumbnail,
+            images.variant_url(obj.thumbnail, obj.thumbnail_variants, "card"),
+        )
+
+    def get_progress(self, obj):
+        """Percentage of the target raised so far"""
+        if not obj.total_target:
+            return 0.0
+        return round(float(obj.get_funding()[0] / obj.total_target * 100), 1)
+
+
 class DonationSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
-    project = ProjectStoreSerializer(read_only=True)
+    project = ProjectSummarySerializer(read_only=True)
 
     class Meta:
         model = Donation
         fields = ["amount", "project", "user", "created_at"]
         read_only_fields = ["id", "created_at"]
 
+    def to_representation(self, instance):
+        if hasattr(instance, "project_pending_amount"):
+            # annotated by Donation.withSummaries, saves a query per row
+            instance.project.pending_amount = instance.project_pending_amount
+            instance.project.pending_donors = instance.project_pending_donors
+        return super().to_representation(instance)
+
     def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError(
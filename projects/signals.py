@@ -0,0 +1,280 @@
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    post_delete,
+    pre_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+from django.db.models import F, QuerySet, Sum
+from django.utils import timezone
+from accounts.models import User
+from .models import (
+    Project,
+    Donation,
+    Ratting,
+    PlatformStatistics,
+    Category,
+    Comments,
+    ProjectImages,
+    DonationBucket,
+    DonationCounterShard,
+    MediaBlob,
+)
+from . import images
+from . import search
+from . import cache as project_cache
+
+
+def _file_released(name):
+    if name:
+        MediaBlob.release([name])
+        # files stored before content addressing have no reference count
+        images.queue(images.delete_unreferenced, [name])
+
+
+def _file_replaced(old_name, new_name):
+    """Move a file reference of a saved row from ``old_name`` to ``new_name``"""
+    if old_name == new_name:
+        return
+    if new_name:
+        MediaBlob.retain([new_name])
+    _file_released(old_name)
+
+
+@receiver(pre_save, sender=Project)
+def project_saving(sender, instance, **kwargs):
+    # Remember the stored flags so the save can tell how the counts moved,
+    # and the stored thumbnail so a replaced one can be cleaned up
+    stored = None
+    if instance.pk:
+        stored = (
+            Project.objects.filter(pk=instance.pk)
+            .values_list("is_active", "is_featured", "thumbnail")
+            .first()
+        )
+    stored = stored or (False, False, None)
+    instance._stored_flags = stored[:2]
+    instance._stored_thumbnail = stored[2]
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, **kwargs):
+    if not created:
+        Project.touch(instance.pk)
+    was_active, was_featured = instance._stored_flags
+    PlatformStatistics.adjust(
+        total_active_projects=int(instance.is_active) - int(was_active),
+        total_featured=int(instance.is_featured) - int(was_featured),
+    )
+    search.index_project(instance)
+    project_cache.invalidate_project(instance.pk)
+    if instance.thumbnail and not images.variants_ready(
+        instance.thumbnail, instance.thumbnail_variants
+    ):
+        images.queue(images.process_thumbnail, instance.pk)
+    _file_replaced(instance._stored_thumbnail, instance.thumbnail.name)
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleting(sender, instance, **kwargs):
+    # Bring the platform total up to date before the donations go with it
+    DonationCounterShard.fold([instance.pk])
+    donors = (
+        Donation.objects.filter(project=instance, user__isnull=False)
+        .values("user")
+        .annotate(total=Sum("amount"))
+        .values_list("user", "total")
+    )
+    for user_id, total in donors:
+        User.adjust_donations(user_id, -total, -1)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    PlatformStatistics.adjust(
+        total_active_projects=-int(instance.is_active),
+        total_featured=-int(instance.is_featured),
+    )
+    search.remove_project(instance.pk)
+    project_cache.invalidate_project(instance.pk)
+    _file_released(instance.thumbnail.name)
+
+
+@receiver(m2m_changed, sender=Project.tags.through)
+def project_tags_changed(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(
+        instance, Project
+    ):
+        Project.touch(instance.pk)
+        search.index_project(instance)
+        project_cache.invalidate_project(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        Project.objects.filter(category=instance).update(
+            version=F("version") + 1, updated_at=timezone.now()
+        )
+        search.set_category_title(instance.pk, instance.title)
+        project_cache.invalidate_projects(
+            Project.objects.filter(category=instance).values_list("pk", flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    search.set_category_title(instance.pk, "")
+    project_cache.invalidate_projects(
+        Project.objects.filter(category=instance).values_list("pk", flat=True)
+    )
+
+
+@receiver(post_save, sender=Donation)
+def donation_saved(sender, instance, created, **kwargs):
+    if created:
+        # the project counters and statistics follow when the shards are
+        # folded, the trending bucket's shards are kept at the donation's time
+        Project.add_donation(instance)
+        User.add_donation(instance)
+        DonationBucket.record(instance.project_id, instance.created_at, instance.amount)
+        project_cache.invalidate_project(instance.project_id)
+
+
+@receiver(post_delete, sender=Donation)
+def donation_deleted(sender, instance, origin=None, **kwargs):
+    PlatformStatistics.adjust(total_money_raised=-instance.amount)
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is not Donation:
+        # deleted along with its project, which takes its counters with it
+        return
+    # A queryset delete removes all its rows before the first signal, so a
+    # donor with several of the deleted donations is only taken out once
+    removed = origin.__dict__.setdefault("_removed_donors", set())
+    donor = (instance.project_id, instance.user_id)
+    donor_removed = donor in removed
+    removed.add(donor)
+    Project.remove_donation(instance, donor_removed)
+    User.remove_donation(instance, donor_removed)
+    if instance.created_at >= DonationBucket.retention_start():
+        DonationBucket.record(
+            instance.project_id, instance.created_at, -instance.amount, count=-1
+        )
+    project_cache.invalidate_project(instance.project_id)
+
+
+@receiver(post_save, sender=Ratting)
+def rating_saved(sender, instance, created, **kwargs):
+    if created:
+        Project.add_rating(instance)
+        project_cache.invalidate_project(instance.project_id)
+    project_cache.invalidate_feed(instance.project_id, "ratings")
+
+
+@receiver(post_delete, sender=Ratting)
+def rating_deleted(sender, instance, **kwargs):
+    Project.remove_rating(instance)
+    project_cache.invalidate_project(instance.project_id)
+    project_cache.invalidate_feed(instance.project_id, "ratings")
+
+
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+@receiver(post_save, sender=ProjectImages)
+@receiver(post_delete, sender=ProjectImages)
+def project_child_changed(sender, instance, **kwargs):
+    Project.touch(instance.project_id)
+    # Comments and gallery images only show on the project detail
+    project_cache.invalidate_project(instance.project_id, listing=False)
+
+
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+def comment_changed(sender, instance, **kwargs):
+    project_cache.invalidate_feed(instance.project_id, "comments")
+
+
+@receiver(post_save, sender=ProjectImages)
+def gallery_image_saved(sender, instance, created, **kwargs):
+    if created:
+        MediaBlob.retain([instance.image.name])
+    if not images.variants_ready(instance.image, instance.variants):
+        images.queue(images.process_gallery_image, instance.pk)
+
+
+@receiver(post_delete, sender=ProjectImages)
+def gallery_image_deleted(sender, instance, **kwargs):
+    _file_released(instance.image.name)
+
+
+# What UserSerializer shows of a user nested in project, comment, rating
+# and donation responses
+USER_PUBLIC_FIELDS = (
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "mobile_phone",
+    "profile_picture",
+)
+
+
+def _public_values(user):
+    values = {field: getattr(user, field) for field in USER_PUBLIC_FIELDS}
+    values["profile_picture"] = user.profile_picture.name
+    return values
+
+
+def user_shown_changed(user_id):
+    """New ETags and cached responses for every project nesting the user"""
+    projects = Project.getProjectsShowingUser(user_id)
+    project_ids = list(projects.values_list("pk", flat=True))
+    Project.touchAll(projects)
+    # the listing only shows the owner's id
+    project_cache.invalidate_projects(project_ids, listing=False)
+    project_cache.invalidate_feeds(project_ids)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    # Remember what other responses show of the user, to tell whether it
+    # changed, and the stored picture so a replaced one can be released
+    instance._stored_public = None
+    if update_fields is not None and not set(update_fields) & set(
+        USER_PUBLIC_FIELDS
+    ):
+        # e.g. the last_login update, nothing shown elsewhere changes
+        instance._stored_public = _public_values(instance)
+    elif instance.pk:
+        instance._stored_public = (
+            User.objects.filter(pk=instance.pk).values(*USER_PUBLIC_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    stored = instance._stored_public
+    _file_replaced(
+        stored and stored["profile_picture"], instance.profile_picture.name
+    )
+    if stored is not None and stored != _public_values(instance):
+        user_shown_changed(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    _file_released(instance.profile_picture.name)
+
+
+@receiver(pre_delete, sender=User)
+def donor_deleted(sender, instance, **kwargs):
+    # The user's donations are kept with user=NULL, so they stop counting as
+    # a distinct backer on every project they gave to.
+    donated_projects = Donation.objects.filter(user=instance).values("project_id")
+    DonationCounterShard.fold(donated_projects)
+    Project.objects.filter(pk__in=donated_projects).update(
+        donors_count=F("donors_count") - 1
+    )
+    # their comments, ratings and donations will show no user
+    user_shown_changed(instance.pk)
@@ -0,0 +1,59 @@
+"""Content-addressed storage for uploaded images.
+
+Files are named after the SHA-256 of their bytes, so identical uploads are
+stored once and a name always refers to the same content, which lets
+clients cache media URLs forever. Each stored file has a ``MediaBlob`` row
+counting the model rows that reference it; ``manage.py gc_media`` deletes
+the ones nothing references any more.
+"""
+
+import hashlib
+import os
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+BLOB_PREFIX = "blobs/"
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def blob_name(digest, extension):
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # a name is only ever rewritten with the same bytes
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        content.seek(0)
+
+        name = blob_name(digest.hexdigest(), os.path.splitext(name)[1])
+        # Register before looking for the file, in the same transaction:
+        # gc_media deletes the row and the file in one transaction too, so
+        # the file is either still there or written again here
+        with transaction.atomic():
+            apps.get_model("projects", "MediaBlob").register(name, size)
+            if not self.exists(name):
+                name = super()._save(name, content)
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
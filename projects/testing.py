@@ -0,0 +1,55 @@
+"""Rows the test suites of the apps build their fixtures from"""
+
+from datetime import timedelta
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
+from accounts.models import User
+from .models import Category, Project
+
+PASSWORD = "Secret@123"
+
+
+def create_user(name, **fields):
+    """An active user ``name`` with the address ``<name>@example.com``"""
+    return User.objects.create_user(
+        **{
+            "email": f"{name}@example.com",
+            "username": name,
+            "password": PASSWORD,
+            "mobile_phone": "01012345678",
+            "profile_picture": "images/default_avatar.jpg",
+            "is_active": True,
+            **fields,
+        }
+    )
+
+
+def create_category(title="Technology"):
+    return Category.objects.create(title=title, description=title)
+
+
+def create_project(user, category, **fields):
+    """An accepted project running for the next 30 days"""
+    start = timezone.now()
+    return Project.objects.create(
+        **{
+            "title": "Project",
+            "details": "A project created by the tests",
+            "total_target": 1000,
+            "start_time": start,
+            "end_time": start + timedelta(days=30),
+            "user": user,
+            "category": category,
+            "is_accepted": True,
+            **fields,
+        }
+    )
+
+
+def image_upload(name="photo.png", size=(2000, 1500), color="teal"):
+    """A PNG upload, the same ``color`` and ``size`` give the same bytes"""
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, "PNG")
+    return SimpleUploadedFile(name, output.getvalue(), content_type="image/png")
@@ -1,3 +1,1476 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from accounts.models import User
+from .models import (
+    Project,
+    Comments,
+    CommentsReports,
+    Donation,
+    DonationBucket,
+    DonationCounterShard,
+    MediaBlob,
+    PlatformStatistics,
+    ProjectImages,
+    ProjectsReports,
+    Ratting,
+)
+from . import cache as project_cache
+from . import images, loadtest, metrics, resize
+from .management.commands import gc_media, rebuild_counters
+from .testing import create_category, create_project, create_user, image_upload
+from .views import DonationBulkStore
 
-# Create your tests here.
+
+class ProjectFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.tech = create_category("Technology")
+        cls.health = create_category("Health")
+        for i in range(12):
+            project = create_project(
+                cls.owner,
+                cls.tech if i % 2 else cls.health,
+                title=f"Project {i}",
+                is_featured=i % 3 == 0,
+                is_accepted=i != 11,
+            )
+            project.tags.add("even" if i % 2 == 0 else "odd", "all")
+
+    def filtered(self, **filters):
+        return list(Project.filterProjects(**filters))
+
+    def test_filters_combine_in_one_queryset(self):
+        projects = self.filtered(
+            category=str(self.tech.pk), is_featured="true", tags="odd"
+        )
+        self.assertEqual(
+            sorted(project.title for project in projects),
+            ["Project 3", "Project 9"],
+        )
+
+    def test_tags_match_all(self):
+        self.assertEqual(len(self.filtered(tags="even,odd")), 11)
+        self.assertEqual(len(self.filtered(tags="even,odd", tags_match="all")), 0)
+        self.assertEqual(len(self.filtered(tags="odd,all", tags_match="all")), 5)
+
+    def test_unaccepted_projects_are_hidden_from_the_public_listing(self):
+        titles = [project.title for project in self.filtered()]
+        self.assertNotIn("Project 11", titles)
+        owner_titles = [
+            project.title for project in self.filtered(user_id=str(self.owner.pk))
+        ]
+        self.assertIn("Project 11", owner_titles)
+
+    def test_created_range(self):
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.filtered(created_after=tomorrow), [])
+        self.assertEqual(len(self.filtered(created_before=tomorrow)), 11)
+
+    def test_latest_and_top_default_to_a_short_list(self):
+        self.assertEqual(len(self.filtered(latest="true")), 5)
+        self.assertEqual(len(self.filtered(is_top="true", limit="3")), 3)
+
+    def test_invalid_user_id_is_ignored(self):
+        titles = [project.title for project in self.filtered(user_id="abc")]
+        self.assertEqual(len(titles), 11)
+        self.assertNotIn("Project 11", titles)
+
+    def listed_ids(self, **params):
+        cache.clear()
+        response = APIClient().get("/api/projects", params)
+        self.assertEqual(response.status_code, 200, response.content[:200])
+        return [project["id"] for project in response.data["results"]]
+
+    def test_cursor_keeps_a_non_default_ordering(self):
+        # the least recent projects are the most funded
+        for funded, project in enumerate(Project.objects.order_by("-id")):
+            Project.objects.filter(pk=project.pk).update(donations_total=funded)
+
+        by_page = self.listed_ids(ordering="most_funded")
+        self.assertEqual(self.listed_ids(ordering="most_funded", cursor=""), by_page)
+        self.assertEqual(
+            self.listed_ids(ordering="oldest", cursor=""),
+            self.listed_ids(ordering="oldest"),
+        )
+        # the default ordering is the keyset one, and it differs
+        self.assertEqual(self.listed_ids(cursor=""), self.listed_ids())
+        self.assertNotEqual(self.listed_ids(cursor=""), by_page)
+
+
+@skipUnless(connection.vendor == "sqlite", "query plans are SQLite specific")
+class ProjectFilterQueryPlanTests(TestCase):
+    def assertPlanUses(self, index, **filters):
+        plan = Project.filterProjects(**filters).explain()
+        self.assertIn(f"USING INDEX {index}", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_default_listing(self):
+        self.assertPlanUses("project_listed_created_idx")
+
+    def test_featured(self):
+        self.assertPlanUses("project_listed_featured_idx", is_featured="true")
+
+    def test_category(self):
+        self.assertPlanUses("project_listed_category_idx", category="1")
+
+    def test_category_with_date_range(self):
+        self.assertPlanUses(
+            "project_listed_category_idx",
+            category="1",
+            created_after="2025-01-01",
+            created_before="2025-12-31",
+        )
+
+    def test_top_rated(self):
+        self.assertPlanUses("project_listed_top_rated_idx", is_top="true")
+
+    def test_most_funded(self):
+        self.assertPlanUses("project_listed_funded_idx", ordering="most_funded")
+
+
+class ProjectListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donors = [create_user(f"donor{i}") for i in range(3)]
+        cls.category = create_category()
+        cls.projects = []
+        for i, donor in enumerate(cls.donors):
+            project = create_project(donor, cls.category, title=f"Project {i}")
+            project.tags.add(f"tag{i}")
+            for other in cls.donors[: i + 1]:
+                Donation.objects.create(user=other, project=project, amount=10)
+            Ratting.objects.create(user=donor, project=project, rate=i + 2)
+            cls.projects.append(project)
+        # the first project's donations are folded, the others still sharded
+        DonationCounterShard.fold([cls.projects[0].pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rows_carry_their_stats(self):
+        with self.assertNumQueries(4):
+            response = APIClient().get("/api/projects")
+
+        rows = {row["title"]: row for row in response.data["results"]}
+        for i in range(3):
+            row = rows[f"Project {i}"]
+            self.assertEqual(Decimal(row["total_donations"]), 10 * (i + 1))
+            self.assertEqual(row["backers_count"], i + 1)
+            self.assertEqual((row["rating"], row["review_count"]), (i + 2, 1))
+            self.assertEqual(row["tags"], [f"tag{i}"])
+            self.assertEqual(row["category_detail"]["title"], "Technology")
+
+
+class PlatformStatisticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.category = create_category()
+
+    def assertStatistics(self, money, active, featured):
+        stats = PlatformStatistics.get()
+        self.assertEqual(stats.total_money_raised, money)
+        self.assertEqual(stats.total_active_projects, active)
+        self.assertEqual(stats.total_featured, featured)
+        DonationCounterShard.fold()
+        stored = PlatformStatistics.objects.values(*PlatformStatistics.compute()).get()
+        self.assertEqual(stored, PlatformStatistics.compute())
+
+    def test_statistics_follow_the_writes(self):
+        featured = create_project(self.owner, self.category, is_featured=True)
+        other = create_project(self.owner, self.category)
+        Donation.objects.create(user=self.owner, project=featured, amount="25.50")
+        self.assertStatistics(Decimal("25.50"), 2, 1)
+
+        other.is_active = False
+        other.save()
+        featured.is_featured = False
+        featured.save()
+        self.assertStatistics(Decimal("25.50"), 1, 0)
+
+        featured.delete()
+        self.assertStatistics(0, 0, 0)
+
+    def test_list_pages_include_the_statistics(self):
+        create_project(self.owner, self.category, is_featured=True)
+        cache.clear()
+
+        response = APIClient().get("/api/projects")
+
+        self.assertEqual(
+            response.data["statistics"],
+            {
+                "total_money_raised": Decimal("0.00"),
+                "total_active_projects": 1,
+                "total_featured": 1,
+            },
+        )
+
+
+class RatingAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.project = create_project(cls.owner, create_category())
+
+    def stored(self):
+        project = Project.objects.get(pk=self.project.pk)
+        return project.rating_sum, project.rating_count, project.rating_average
+
+    def test_ratings_update_the_aggregates(self):
+        first = Ratting.objects.create(project=self.project, user=self.owner, rate=4)
+        Ratting.objects.create(project=self.project, user=self.owner, rate="4.5")
+        self.assertEqual(self.stored(), (Decimal("8.5"), 2, 4.25))
+
+        first.delete()
+        self.assertEqual(self.stored(), (Decimal("4.5"), 1, 4.5))
+
+        Ratting.objects.get().delete()
+        self.assertEqual(self.stored(), (Decimal("0.0"), 0, 0.0))
+
+    def test_rating_through_the_api(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+
+        response = client.post(
+            f"/api/projects/{self.project.pk}/ratings", {"rate": "3.5"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        detail = client.get(f"/api/projects/{self.project.pk}/")
+        self.assertEqual((detail.data["rating"], detail.data["review_count"]), (3.5, 1))
+
+
+@skipUnless(connection.vendor == "sqlite", "the FTS5 index is SQLite specific")
+class ProjectSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.category = create_category()
+        cls.in_details = create_project(
+            cls.owner,
+            cls.category,
+            title="Community garden",
+            details="Raised beds, watered by solar powered pumps",
+        )
+        cls.in_title = create_project(cls.owner, cls.category, title="Solar school")
+        create_project(cls.owner, cls.category, title="Bike repair")
+
+    def titles(self, text):
+        return [project.title for project in Project.filterProjects(search=text)]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles("solar"), ["Solar school", "Community garden"])
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.titles("garde"), ["Community garden"])
+        self.assertEqual(self.titles("sol sch"), ["Solar school"])
+        self.assertEqual(self.titles("!!"), [])
+
+    def test_renamed_project_is_reindexed(self):
+        self.in_title.title = "Wind school"
+        self.in_title.save()
+
+        self.assertEqual(self.titles("solar"), ["Community garden"])
+        self.assertEqual(self.titles("wind"), ["Wind school"])
+
+    def test_tags_and_category_are_indexed(self):
+        self.in_title.tags.add("renewables")
+        self.category.title = "Environment"
+        self.category.save()
+
+        self.assertEqual(self.titles("renewables"), ["Solar school"])
+        self.assertEqual(len(self.titles("environment")), 3)
+
+    def test_reindex_rebuilds_the_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM projects_project_fts")
+        self.assertEqual(self.titles("solar"), [])
+        output = StringIO()
+
+        call_command("reindex", stdout=output)
+
+        self.assertIn("Indexed 3 project(s)", output.getvalue())
+        self.assertEqual(self.titles("solar"), ["Solar school", "Community garden"])
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner", is_staff=True)
+        cls.project = create_project(cls.owner, create_category())
+        cls.detail_url = f"/api/projects/{cls.project.pk}/"
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def stats(self):
+        return project_cache.stats()
+
+    def test_second_anonymous_read_is_a_hit(self):
+        first = self.client.get("/api/projects")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/projects")
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.stats()["hits"], 1)
+        self.assertEqual(self.stats()["misses"], 1)
+
+    def test_query_strings_are_cached_apart(self):
+        self.client.get("/api/projects")
+        self.client.get("/api/projects", {"page_size": 1})
+
+        self.assertEqual(self.stats()["misses"], 2)
+
+    def test_authenticated_reads_skip_the_cache(self):
+        self.client.force_authenticate(self.owner)
+        self.client.get("/api/projects")
+        self.client.get("/api/projects")
+
+        self.assertEqual(self.stats(), {"hits": 0, "misses": 0, "hit_ratio": None})
+
+    def test_donation_invalidates_the_list_and_the_detail(self):
+        self.client.get("/api/projects")
+        self.client.get(self.detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Donation.objects.create(user=self.owner, project=self.project, amount=10)
+
+        listing = self.client.get("/api/projects")
+        detail = self.client.get(self.detail_url)
+        self.assertEqual(Decimal(listing.data["results"][0]["total_donations"]), 10)
+        self.assertEqual(Decimal(detail.data["total_donations"]), 10)
+        self.assertEqual(self.stats()["hits"], 0)
+
+    def test_comment_only_invalidates_the_detail(self):
+        self.client.get("/api/projects")
+        self.client.get(self.detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comments.objects.create(user=self.owner, project=self.project, body="Hi")
+
+        self.client.get("/api/projects")
+        self.client.get(self.detail_url)
+        self.assertEqual(self.stats()["hits"], 1)
+        self.assertEqual(self.stats()["misses"], 3)
+
+    def test_stats_endpoint(self):
+        self.client.get("/api/projects")
+        self.client.get("/api/projects")
+        self.client.force_authenticate(self.owner)
+
+        response = self.client.get("/api/cache/stats")
+
+        self.assertEqual(response.data, {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.project = create_project(cls.owner, create_category())
+        cls.comments_url = f"/api/projects/{cls.project.pk}/comments"
+        cls.ratings_url = f"/api/projects/{cls.project.pk}/ratings"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        cache.clear()
+
+    def bodies(self):
+        response = self.client.get(self.comments_url)
+        return [comment["body"] for comment in response.data["results"]]
+
+    def test_first_page_is_cached_for_authenticated_users(self):
+        self.client.get(self.comments_url)
+        self.client.get(self.comments_url)
+
+        self.assertEqual(project_cache.stats()["hits"], 1)
+
+    def test_later_pages_are_not_cached(self):
+        Comments.objects.create(user=self.owner, project=self.project, body="Hi")
+
+        self.client.get(self.comments_url, {"page": 2})
+        self.client.get(self.comments_url, {"page": 2})
+
+        self.assertEqual(project_cache.stats()["misses"], 0)
+
+    def test_posted_and_deleted_comments_invalidate_the_feed(self):
+        self.assertEqual(self.bodies(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.comments_url, {"body": "First"}, format="json"
+            )
+        self.assertEqual(self.bodies(), ["First"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/comments/{response.data['id']}")
+        self.assertEqual(self.bodies(), [])
+
+    def test_each_feed_is_invalidated_on_its_own(self):
+        self.client.get(self.comments_url)
+        self.client.get(self.ratings_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ratting.objects.create(user=self.owner, project=self.project, rate=4)
+
+        self.client.get(self.comments_url)
+        ratings = self.client.get(self.ratings_url)
+        self.assertEqual(len(ratings.data["results"]), 1)
+        self.assertEqual(project_cache.stats()["hits"], 1)
+        self.assertEqual(project_cache.stats()["misses"], 3)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner", first_name="Old")
+        cls.project = create_project(cls.owner, create_category())
+        cls.url = f"/api/projects/{cls.project.pk}/"
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def get(self, url, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(url, headers=headers)
+
+    def test_unchanged_project_answers_304(self):
+        etag = self.get(self.url)["ETag"]
+
+        response = self.get(self.url, etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_donation_changes_the_etags(self):
+        donations_url = f"{self.url}donations"
+        etag = self.get(self.url)["ETag"]
+        feed_etag = self.get(donations_url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Donation.objects.create(user=self.owner, project=self.project, amount=10)
+
+        response = self.get(self.url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data["total_donations"]), 10)
+        self.assertEqual(self.get(donations_url, feed_etag).status_code, 200)
+
+    def test_comment_changes_the_feed_etag(self):
+        url = f"{self.url}comments"
+        etag = self.get(url)["ETag"]
+        self.assertEqual(self.get(url, etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comments.objects.create(user=self.owner, project=self.project, body="Hi")
+
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["body"], "Hi")
+
+    def test_renamed_owner_changes_the_etag(self):
+        etag = self.get(self.url)["ETag"]
+
+        self.owner.first_name = "New"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.save()
+
+        response = self.get(self.url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["owner"]["first_name"], "New")
+
+    def test_renamed_commenter_shows_in_the_cached_feed(self):
+        commenter = create_user("commenter", first_name="Old")
+        with self.captureOnCommitCallbacks(execute=True):
+            Comments.objects.create(user=commenter, project=self.project, body="Hi")
+        url = f"{self.url}comments"
+        self.assertEqual(self.get(url).data["results"][0]["user"]["first_name"], "Old")
+
+        commenter.first_name = "New"
+        with self.captureOnCommitCallbacks(execute=True):
+            commenter.save()
+
+        response = self.get(url)
+        self.assertEqual(response.data["results"][0]["user"]["first_name"], "New")
+
+    def test_login_keeps_the_etag(self):
+        etag = self.get(self.url)["ETag"]
+
+        self.owner.last_login = timezone.now()
+        self.owner.save(update_fields=["last_login"])
+
+        self.assertEqual(self.get(self.url, etag).status_code, 304)
+
+
+class QueryBudgetTests(TestCase):
+    """Each endpoint runs a fixed number of queries, whatever the page size.
+
+    A serializer field that loads a relation per row makes the page of 50
+    cost more than the page of 1 and fails here.
+    """
+
+    PAGE_SIZES = (1, 50)
+    ROWS = 60
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(
+                email=f"user{i}@example.com",
+                username=f"user{i}",
+                mobile_phone="01012345678",
+                profile_picture="images/default_avatar.jpg",
+                is_active=True,
+            )
+            for i in range(cls.ROWS)
+        )
+        cls.users = list(User.objects.order_by("id"))
+        cls.admin = create_user("admin", is_staff=True)
+        categories = [create_category(f"Category {i}") for i in range(3)]
+        cls.projects = []
+        for i in range(cls.ROWS):
+            project = create_project(
+                cls.users[i], categories[i % 3], title=f"Project {i}"
+            )
+            project.tags.add(f"tag{i % 5}", "all")
+            cls.projects.append(project)
+        cls.project = cls.projects[0]
+        ProjectImages.objects.bulk_create(
+            ProjectImages(
+                project=project, image=f"media/projects/{project.pk}-{n}.jpg"
+            )
+            for project in cls.projects
+            for n in range(2)
+        )
+        for i, user in enumerate(cls.users):
+            Donation.objects.create(user=user, project=cls.project, amount=10)
+            Donation.objects.create(
+                user=cls.users[0], project=cls.projects[i], amount=5
+            )
+            Ratting.objects.create(user=user, project=cls.project, rate=4)
+            Comments.objects.create(user=user, project=cls.project, body="Comment")
+            ProjectsReports.objects.create(
+                user=user, project=cls.project, details="Report"
+            )
+        cls.comment = Comments.objects.filter(project=cls.project).first()
+        for user in cls.users:
+            CommentsReports.objects.create(
+                user=user, comment=cls.comment, details="Report"
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        # the response caches would hide what building the page costs
+        cache.clear()
+
+    def get(self, url, budget, user=None, params=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, response.content[:200])
+        cache.clear()
+        return response
+
+    def send(self, method, url, budget, data, user):
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 300, response.content[:200])
+        return response
+
+    def assertListBudget(self, url, budget, user=None, params=None):
+        for page_size in self.PAGE_SIZES:
+            with self.subTest(url=url, page_size=page_size, params=params):
+                response = self.get(
+                    url, budget, user, {**(params or {}), "page_size": page_size}
+                )
+                results = response.data["results"]
+                # the large page must hold several rows to catch a per-row query
+                self.assertGreaterEqual(len(results), min(page_size, 2))
+                self.assertLessEqual(len(results), page_size)
+
+    def assertPagedBudgets(self, url, page_budget, cursor_budget, user=None):
+        self.assertListBudget(url, page_budget, user)
+        self.assertListBudget(url, cursor_budget, user, {"cursor": ""})
+
+    def test_project_list(self):
+        self.assertPagedBudgets("/api/projects", 4, 3)
+        self.assertListBudget("/api/projects", 4, params={"category": "1"})
+        self.assertListBudget("/api/projects", 4, params={"search": "Project"})
+        self.assertListBudget("/api/projects", 4, user=self.admin)
+
+    def test_project_detail(self):
+        self.get(f"/api/projects/{self.project.pk}/", 7)
+
+    def test_comments(self):
+        self.assertPagedBudgets(f"/api/projects/{self.project.pk}/comments", 4, 3)
+        self.get(f"/api/comments/{self.comment.pk}", 2)
+
+    def test_ratings(self):
+        self.assertPagedBudgets(f"/api/projects/{self.project.pk}/ratings", 4, 3)
+        rating = Ratting.objects.first()
+        self.get(f"/api/projects/ratings/{rating.pk}", 2)
+
+    def test_donations(self):
+        self.assertPagedBudgets(f"/api/projects/{self.project.pk}/donations", 4, 3)
+        self.assertPagedBudgets("/api/projects/0/donations", 2, 1)
+        donation = Donation.objects.first()
+        self.get(f"/api/projects/donation/{donation.pk}", 5)
+
+    def test_reports(self):
+        self.assertListBudget(
+            f"/api/projects/{self.project.pk}/reports", 3, user=self.admin
+        )
+        report = ProjectsReports.objects.first()
+        self.get(f"/api/projects/reports/{report.pk}", 2, user=self.admin)
+        self.assertListBudget("/api/comments/0/reports", 2)
+        report = CommentsReports.objects.first()
+        self.get(f"/api/comments/reports/{report.pk}", 2)
+
+    def test_categories_and_cache_stats(self):
+        self.get("/api/category", 1)
+        self.get("/api/cache/stats", 0, user=self.admin)
+
+    def test_bulk_donations(self):
+        # a project without a trending bucket each time, so both batches
+        # start one whichever time slot the test runs in
+        DonationBucket.objects.all().delete()
+        for rows, project in zip(self.PAGE_SIZES, self.projects[2:]):
+            with self.subTest(rows=rows):
+                donations = [
+                    {"project": project.pk, "user": self.users[1].pk, "amount": 5}
+                ] * rows
+                self.send("post", "/api/donations/bulk", 13, donations, self.admin)
+
+    def test_project_moderation(self):
+        project = self.projects[1]
+        self.send(
+            "patch",
+            f"/api/projects/{project.pk}/featured",
+            13,
+            {"is_featured": True},
+            self.admin,
+        )
+        self.send(
+            "patch",
+            f"/api/projects/{project.pk}/accept",
+            8,
+            {"is_accepted": False},
+            self.admin,
+        )
+        self.send(
+            "patch",
+            f"/api/projects/{project.pk}/cancel",
+            12,
+            {"is_active": False},
+            self.admin,
+        )
+
+
+class BulkDonationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin", is_staff=True)
+        cls.project = create_project(cls.admin, create_category())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, rows):
+        return self.client.post("/api/donations/bulk", rows, format="json")
+
+    def test_bad_rows_are_reported_and_good_ones_created(self):
+        response = self.post(
+            [
+                {"project": self.project.pk, "amount": "10"},
+                {"project": self.project.pk, "amount": "NaN"},
+                {"project": self.project.pk, "amount": "Infinity"},
+                {"project": self.project.pk, "amount": "abc"},
+                {"project": self.project.pk, "amount": "0.5"},
+                {"project": self.project.pk + 100, "amount": "10"},
+                {"project": self.project.pk, "user": 999999, "amount": "10"},
+            ]
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["failed"], 6)
+        errors = {
+            result["row"]: set(result["errors"])
+            for result in response.data["results"]
+            if result["status"] == "error"
+        }
+        self.assertEqual(
+            errors,
+            {
+                1: {"amount"},
+                2: {"amount"},
+                3: {"amount"},
+                4: {"amount"},
+                5: {"project"},
+                6: {"user"},
+            },
+        )
+        self.assertEqual(Donation.objects.get().amount, 10)
+
+    def test_only_bad_rows(self):
+        response = self.post([{"project": self.project.pk, "amount": "NaN"}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Donation.objects.exists())
+
+    def test_too_many_rows(self):
+        rows = [{"project": self.project.pk, "amount": "1"}] * (
+            DonationBulkStore.max_rows + 1
+        )
+
+        response = self.post(rows)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Donation.objects.exists())
+
+    def test_import_command_carries_on_after_bad_rows(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as source:
+            source.write("project,amount,user\n")
+            source.write(f"{self.project.pk},NaN,\n")
+            source.write(f"{self.project.pk + 100},10,\n")
+            source.write(f"{self.project.pk},10,999999\n")
+            source.write(f"{self.project.pk},25,{self.admin.pk}\n")
+            source.flush()
+            output = StringIO()
+
+            call_command("import_donations", source.name, stdout=output)
+
+        self.assertIn("Imported 1 donation(s), 3 failed", output.getvalue())
+        donation = Donation.objects.get()
+        self.assertEqual((donation.amount, donation.user), (25, self.admin))
+
+
+class DonationCounterShardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_user("donor")
+        cls.project = create_project(cls.donor, create_category())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+        cache.clear()
+
+    def donate(self, amount):
+        response = self.client.post(
+            f"/api/projects/{self.project.pk}/donations",
+            {"amount": amount},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content[:200])
+
+    def test_donations_are_counted_before_and_after_the_fold(self):
+        self.donate("10.00")
+        self.donate("15.50")
+
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual(project.donations_total, 0)
+        self.assertEqual(project.get_funding()[:2], (Decimal("25.50"), 1))
+        detail = self.client.get(f"/api/projects/{self.project.pk}/")
+        self.assertEqual(Decimal(detail.data["total_donations"]), Decimal("25.50"))
+        # trending does not wait for the fold
+        trending = Project.filterProjects(trending="true")
+        self.assertEqual([p.pk for p in trending], [self.project.pk])
+
+        self.assertEqual(DonationCounterShard.fold(), 1)
+
+        self.assertFalse(DonationCounterShard.objects.exists())
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual(
+            (project.donations_total, project.donors_count), (Decimal("25.50"), 1)
+        )
+        self.assertEqual(project.get_funding()[:2], (Decimal("25.50"), 1))
+        self.assertEqual(
+            DonationBucket.objects.get(project=self.project).amount, Decimal("25.50")
+        )
+        self.assertEqual(PlatformStatistics.get().total_money_raised, Decimal("25.50"))
+
+    def test_trending_deltas_stay_in_the_shards_until_the_fold(self):
+        for amount in ("10.00", "15.50", "4.50"):
+            self.donate(amount)
+
+        buckets = DonationBucket.objects.filter(project=self.project)
+        self.assertFalse(buckets.filter(shard=DonationBucket.FOLDED).exists())
+        self.assertEqual(sum(bucket.amount for bucket in buckets), 30)
+
+        DonationCounterShard.fold()
+
+        bucket = DonationBucket.objects.get(project=self.project)
+        self.assertEqual(
+            (bucket.shard, bucket.amount, bucket.count),
+            (DonationBucket.FOLDED, Decimal("30.00"), 3),
+        )
+
+    def test_deleted_donations_leave_the_trending_feed(self):
+        self.donate("10.00")
+        DonationCounterShard.fold()
+        self.donate("5.00")
+
+        Donation.objects.filter(project=self.project).delete()
+
+        self.assertEqual(list(Project.filterProjects(trending="true")), [])
+
+    def test_queryset_delete_takes_each_donor_out_once(self):
+        other = create_user("other")
+        for amount in ("10.00", "5.00"):
+            self.donate(amount)
+        Donation.objects.create(user=other, project=self.project, amount=1)
+        DonationCounterShard.fold()
+
+        Donation.objects.filter(project=self.project, user=self.donor).delete()
+
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual((project.donations_total, project.donors_count), (1, 1))
+        self.donor.refresh_from_db()
+        self.assertEqual(
+            (self.donor.donations_total, self.donor.projects_donated_count), (0, 0)
+        )
+
+
+class TrendingWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = create_user("owner")
+        category = create_category()
+        now = timezone.now()
+        cls.week, cls.day, cls.hour = [
+            create_project(owner, category, title=title)
+            for title in ("Week", "Day", "Hour")
+        ]
+        DonationBucket.record(cls.week.pk, now - timedelta(days=2), 100)
+        DonationBucket.record(cls.day.pk, now - timedelta(hours=3), 50)
+        DonationBucket.record(cls.hour.pk, now, 20)
+        DonationBucket.record(cls.hour.pk, now, 5)
+
+    def trending(self, window=None):
+        projects = Project.filterProjects(trending="true", window=window)
+        return [project.title for project in projects]
+
+    def test_each_window_ranks_its_donations_by_amount(self):
+        self.assertEqual(self.trending("1h"), ["Hour"])
+        self.assertEqual(self.trending("24h"), ["Day", "Hour"])
+        self.assertEqual(self.trending("7d"), ["Week", "Day", "Hour"])
+
+    def test_unknown_window_falls_back_to_a_day(self):
+        self.assertEqual(self.trending(), ["Day", "Hour"])
+        self.assertEqual(self.trending("1y"), ["Day", "Hour"])
+
+    def test_shards_of_a_bucket_are_summed(self):
+        project = Project.filterProjects(trending="true", window="1h").get()
+
+        self.assertEqual(project.trending_amount, 25)
+        self.assertEqual(project.trending_count, 2)
+
+    def test_equal_amounts_rank_by_count(self):
+        DonationBucket.record(self.day.pk, timezone.now(), 25, count=3)
+
+        self.assertEqual(self.trending("1h"), ["Day", "Hour"])
+
+    def test_api_window_parameter(self):
+        response = APIClient().get(
+            "/api/projects", {"trending": "true", "window": "1h"}
+        )
+
+        titles = [project["title"] for project in response.data["results"]]
+        self.assertEqual(titles, ["Hour"])
+
+
+class RebuildCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donors = donors = [create_user(f"donor{i}") for i in range(3)]
+        cls.project = project = create_project(
+            donors[0], create_category(), total_target=100000
+        )
+        # sums SQLite can't represent exactly as floats
+        for i in range(200):
+            Donation.objects.create(
+                project=project,
+                user=donors[i % 3],
+                amount=Decimal("1234.57") + Decimal(i) / 100,
+            )
+            Ratting.objects.create(project=project, user=donors[i % 3], rate="4.7")
+        DonationCounterShard.fold()
+
+    def test_check_passes_on_consistent_counters(self):
+        output = StringIO()
+
+        call_command("rebuild_counters", check=True, stdout=output)
+
+        self.assertIn("All counters are consistent", output.getvalue())
+
+    def test_rebuild_leaves_consistent_counters_alone(self):
+        output = StringIO()
+
+        call_command("rebuild_counters", stdout=output)
+
+        self.assertIn("Rebuilt counters for 0 project(s)", output.getvalue())
+        self.assertIn("Rebuilt donation totals for 0 user(s)", output.getvalue())
+
+    def assertConsistent(self):
+        output = StringIO()
+        call_command("rebuild_counters", check=True, stdout=output)
+        self.assertIn("All counters are consistent", output.getvalue())
+
+    def test_rebuild_fixes_drifted_counters(self):
+        Project.objects.update(
+            donations_total=0, donors_count=0, rating_count=1, rating_average=0
+        )
+        User.objects.update(donations_total=0)
+        output = StringIO()
+
+        call_command("rebuild_counters", stdout=output)
+
+        self.assertIn("Rebuilt counters for 1 project(s)", output.getvalue())
+        self.assertIn("Rebuilt donation totals for 3 user(s)", output.getvalue())
+        self.assertConsistent()
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual((project.donors_count, project.rating_count), (3, 200))
+        self.assertAlmostEqual(project.rating_average, 4.7)
+
+    def test_rebuild_keeps_donations_folded_after_the_read(self):
+        Project.objects.update(donations_total=F("donations_total") - 100)
+        original = rebuild_counters.project_shifted
+
+        def fold_meanwhile(project, expected):
+            Donation.objects.create(
+                project=self.project, user=self.donors[0], amount=50
+            )
+            DonationCounterShard.fold()
+            return original(project, expected)
+
+        with mock.patch.object(
+            rebuild_counters, "project_shifted", side_effect=fold_meanwhile
+        ):
+            call_command("rebuild_counters", stdout=StringIO())
+
+        self.assertConsistent()
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.category = create_category()
+
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+    def create_project(self, thumbnail):
+        with self.captureOnCommitCallbacks(execute=True):
+            project = create_project(self.owner, self.category, thumbnail=thumbnail)
+        project.refresh_from_db()
+        return project
+
+    def variant_size(self, variants, variant):
+        with default_storage.open(variants[variant]) as stored:
+            with Image.open(stored) as image:
+                return image.size, image.format
+
+    def test_thumbnail_variants_fit_their_boxes(self):
+        project = self.create_project(image_upload())
+
+        variants = project.thumbnail_variants
+        self.assertEqual(variants["source"], project.thumbnail.name)
+        self.assertEqual(self.variant_size(variants, "card"), ((480, 360), "JPEG"))
+        self.assertEqual(self.variant_size(variants, "detail"), ((1280, 960), "JPEG"))
+
+    def test_small_thumbnails_are_not_scaled_up(self):
+        project = self.create_project(image_upload(size=(300, 100)))
+
+        variants = project.thumbnail_variants
+        self.assertEqual(self.variant_size(variants, "card"), ((300, 100), "JPEG"))
+
+    def test_original_is_served_until_the_variants_are_ready(self):
+        project = create_project(self.owner, self.category, thumbnail=image_upload())
+
+        self.assertFalse(
+            images.variants_ready(project.thumbnail, project.thumbnail_variants)
+        )
+        self.assertEqual(
+            images.variant_url(project.thumbnail, project.thumbnail_variants, "card"),
+            project.thumbnail.url,
+        )
+
+    def test_replaced_thumbnail_gets_new_variants(self):
+        project = self.create_project(image_upload())
+        old_card = project.thumbnail_variants["card"]
+
+        project.thumbnail = image_upload(color="navy")
+        with self.captureOnCommitCallbacks(execute=True):
+            project.save()
+
+        project.refresh_from_db()
+        variants = project.thumbnail_variants
+        self.assertEqual(variants["source"], project.thumbnail.name)
+        self.assertNotEqual(variants["card"], old_card)
+        self.assertEqual(
+            images.variant_url(project.thumbnail, variants, "card"),
+            default_storage.url(variants["card"]),
+        )
+
+    def test_gallery_images_get_a_gallery_variant(self):
+        project = self.create_project(image_upload())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectImages.add_images(project, [image_upload(color="navy")])
+
+        image = project.images.get()
+        self.assertEqual(image.variants["source"], image.image.name)
+        self.assertEqual(
+            self.variant_size(image.variants, "gallery"), ((960, 720), "JPEG")
+        )
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
+class GalleryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.project = create_project(cls.owner, create_category())
+        cls.url = f"/api/projects/{cls.project.pk}/"
+
+    def setUp(self):
+        media = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        # saving the project renders the variants of its default thumbnail
+        (media / "images").mkdir()
+        Image.new("RGB", (800, 600)).save(media / "images/default_thumbnail.jpg")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def add(self, *colors):
+        uploads = [image_upload(color=color) for color in colors]
+        with self.captureOnCommitCallbacks(execute=True):
+            return ProjectImages.add_images(self.project, uploads)
+
+    def gallery(self):
+        images = self.project.images.order_by("position", "id")
+        return list(images.values_list("pk", flat=True))
+
+    def test_add_appends_and_skips_duplicates(self):
+        red, blue = self.add("red", "blue", "red")
+        green = self.add("green", "blue")[0]
+
+        self.assertEqual(self.gallery(), [red.pk, blue.pk, green.pk])
+        self.assertEqual(
+            list(self.project.images.values_list("position", flat=True)), [1, 2, 3]
+        )
+        self.assertEqual(self.add("red"), [])
+
+    def test_remove_by_id_or_content_hash(self):
+        red, blue, green = self.add("red", "blue", "green")
+
+        removed = ProjectImages.remove_images(
+            self.project, [str(red.pk), green.content_hash, "unknown"]
+        )
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(self.gallery(), [blue.pk])
+
+    def test_reorder_moves_the_listed_images_first(self):
+        red, blue, green = self.add("red", "blue", "green")
+
+        changed = ProjectImages.reorder(self.project, [green.content_hash, blue.pk])
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.gallery(), [green.pk, blue.pk, red.pk])
+        self.assertEqual(ProjectImages.reorder(self.project, [green.pk]), 0)
+
+    def test_images_of_other_projects_are_not_touched(self):
+        other = create_project(self.owner, self.project.category)
+        with self.captureOnCommitCallbacks(execute=True):
+            (foreign,) = ProjectImages.add_images(other, [image_upload()])
+
+        self.assertEqual(ProjectImages.remove_images(self.project, [foreign.pk]), 0)
+        self.assertTrue(ProjectImages.objects.filter(pk=foreign.pk).exists())
+
+    def test_patch_removes_adds_and_reorders(self):
+        red, blue = self.add("red", "blue")
+        green = image_upload(color="green")
+        green_hash = images.content_hash(green)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                self.url,
+                {
+                    "remove_images": [red.pk],
+                    "images": [green, image_upload(color="blue")],
+                    "image_order": [green_hash, blue.pk],
+                },
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        green = self.project.images.get(content_hash=green_hash)
+        self.assertEqual(self.gallery(), [green.pk, blue.pk])
+        self.assertEqual(
+            [image["id"] for image in response.data["images"]], [green.pk, blue.pk]
+        )
+
+    def test_gallery_change_invalidates_the_cached_detail(self):
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get(self.url).data["images"], [])
+
+        self.add("red")
+
+        self.assertEqual(len(anonymous.get(self.url).data["images"]), 1)
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
+class MediaBlobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user("owner")
+        cls.category = create_category()
+
+    def setUp(self):
+        self.media = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+
+    def create_project(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_project(self.owner, self.category, **fields)
+
+    def blob(self, name):
+        return MediaBlob.objects.get(name=name)
+
+    def stored_blobs(self):
+        return sorted(path.name for path in (self.media / "blobs").rglob("*.*"))
+
+    def gc(self, *args):
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("gc_media", *args, stdout=output)
+        return output.getvalue()
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.create_project(thumbnail=image_upload("a.png"))
+        second = self.create_project(thumbnail=image_upload("b.png"))
+
+        name = first.thumbnail.name
+        self.assertEqual(second.thumbnail.name, name)
+        self.assertTrue(name.startswith("blobs/"))
+        self.assertEqual(self.stored_blobs(), [Path(name).name])
+        self.assertEqual(self.blob(name).references, 2)
+
+    def test_replacing_and_deleting_release_the_reference(self):
+        project = self.create_project(thumbnail=image_upload())
+        old_name = project.thumbnail.name
+
+        project.thumbnail = image_upload(color="navy")
+        with self.captureOnCommitCallbacks(execute=True):
+            project.save()
+
+        self.assertEqual(self.blob(old_name).references, 0)
+        self.assertEqual(self.blob(project.thumbnail.name).references, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            project.delete()
+        self.assertEqual(self.blob(project.thumbnail.name).references, 0)
+
+    def test_gc_deletes_unreferenced_blobs_after_the_grace_period(self):
+        kept = self.create_project(thumbnail=image_upload())
+        dropped = self.create_project(thumbnail=image_upload(color="navy"))
+        name = dropped.thumbnail.name
+        with self.captureOnCommitCallbacks(execute=True):
+            dropped.delete()
+
+        self.assertIn("Deleted 0 blob(s)", self.gc())
+        MediaBlob.objects.filter(name=name).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertIn("Would delete 1 blob(s)", self.gc("--dry-run"))
+        self.assertTrue((self.media / name).exists())
+
+        self.assertIn("Deleted 1 blob(s)", self.gc())
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse((self.media / name).exists())
+        self.assertFalse((self.media / images.variant_name(name, "card")).exists())
+        self.assertTrue((self.media / kept.thumbnail.name).exists())
+
+    def test_gc_skips_blobs_referenced_again_since_the_read(self):
+        project = self.create_project(thumbnail=image_upload())
+        name = project.thumbnail.name
+        MediaBlob.objects.filter(name=name).update(
+            references=0, updated_at=timezone.now() - timedelta(days=2)
+        )
+        stale = self.blob(name)
+        MediaBlob.retain([name])
+
+        deleted = gc_media.Command().delete(stale)
+
+        self.assertFalse(deleted)
+        self.assertTrue((self.media / name).exists())
+
+    def test_recount_fixes_drifted_references(self):
+        project = self.create_project(thumbnail=image_upload())
+        name = project.thumbnail.name
+        MediaBlob.objects.filter(name=name).update(
+            references=0, updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        output = self.gc("--recount")
+
+        self.assertIn(f"{name}: 0 reference(s), expected 1", output)
+        self.assertIn("Deleted 0 blob(s)", output)
+        self.assertEqual(self.blob(name).references, 1)
+        self.assertTrue((self.media / name).exists())
+
+
+@override_settings(METRICS_DIR=None)
+class MetricsTests(TestCase):
+    LABELS = 'view="project-list-create",method="GET",status="200"'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin", is_staff=True)
+        create_project(cls.admin, create_category())
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    def scrape(self, **extra):
+        response = self.client.get("/metrics", **extra)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_requests_are_timed_per_view(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/projects")
+        self.client.get("/api/projects")
+        self.client.get("/no-such-page")
+
+        lines = self.scrape()
+
+        self.assertIn(f"http_request_duration_seconds_count{{{self.LABELS}}} 2", lines)
+        self.assertIn(
+            f"http_request_db_queries_sum{{{self.LABELS}}} {2 * len(queries)}", lines
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{view="unmatched",method="GET",'
+            'status="404"} 1',
+            lines,
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        labels = ("view", "GET", "200")
+        for queries in (0, 3, 300):
+            metrics.registry.observe(labels, {"http_request_db_queries": queries})
+
+        text = metrics.render(metrics.registry.snapshot())
+
+        prefix = 'http_request_db_queries_bucket{view="view",method="GET",status="200"'
+        self.assertIn(f'{prefix},le="0"}} 1', text)
+        self.assertIn(f'{prefix},le="5"}} 2', text)
+        self.assertIn(f'{prefix},le="200"}} 2', text)
+        self.assertIn(f'{prefix},le="+Inf"}} 3', text)
+
+    def test_endpoint_is_limited_to_staff_and_allowed_addresses(self):
+        self.assertEqual(
+            self.client.get("/metrics", REMOTE_ADDR="10.0.0.1").status_code, 403
+        )
+
+        self.client.force_login(self.admin)
+        self.scrape(REMOTE_ADDR="10.0.0.1")
+
+    def test_dumps_of_other_workers_are_added(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(METRICS_DIR=directory))
+        self.client.get("/api/projects")
+        metrics.registry.flush(force=True)
+        labels = ["project-list-create", "GET", "200"]
+        series = metrics.registry.snapshot()[
+            ("http_request_duration_seconds", tuple(labels))
+        ]
+        other = [
+            ["http_request_duration_seconds", labels, series],
+            # written with other buckets by an older release
+            ["http_request_db_queries", labels, [1]],
+        ]
+        (directory / "other.json").write_text(json.dumps(other))
+
+        lines = self.scrape()
+
+        self.assertIn(f"http_request_duration_seconds_count{{{self.LABELS}}} 2", lines)
+        self.assertIn(f"http_request_db_queries_count{{{self.LABELS}}} 1", lines)
+
+
+class LoadTestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = create_user("owner")
+        category = create_category()
+        for i in range(3):
+            create_project(owner, category, title=f"Project {i}")
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadtest.parse_mix("projects.browse=3, users.me=0.5"),
+            {"projects.browse": 3.0, "users.me": 0.5},
+        )
+        for text in (
+            "projects.unknown=1",
+            "projects.browse=many",
+            "projects.browse=-1",
+            "projects.browse=0,users.me=0",
+        ):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                loadtest.parse_mix(text)
+
+    def test_percentile_is_the_nearest_rank(self):
+        ordered = list(range(1, 101))
+
+        self.assertEqual(loadtest.percentile(ordered, 0.5), 50)
+        self.assertEqual(loadtest.percentile(ordered, 0.99), 99)
+        self.assertEqual(loadtest.percentile([7], 0.95), 7)
+        self.assertEqual(loadtest.percentile(ordered, 0), 1)
+
+    def test_summarize_per_endpoint_and_in_total(self):
+        samples = [
+            ("projects.browse", 0.1, 200),
+            ("projects.browse", 0.3, 200),
+            ("users.me", 0.2, 401),
+            ("users.me", 0.4, None),
+        ]
+
+        summary = loadtest.summarize(samples, elapsed=2)
+
+        self.assertEqual(list(summary), ["projects.browse", "users.me", "total"])
+        browse = summary["projects.browse"]
+        self.assertEqual((browse["requests"], browse["throughput"]), (2, 1.0))
+        self.assertAlmostEqual(browse["mean"], 0.2)
+        self.assertEqual((browse["p50"], browse["max"]), (0.1, 0.3))
+        self.assertEqual(browse["error_rate"], 0)
+        self.assertEqual(summary["users.me"]["errors"], {"401": 1, "exception": 1})
+        self.assertEqual(summary["total"]["error_rate"], 0.5)
+        self.assertEqual(loadtest.summarize([], elapsed=1), {})
+
+    def test_every_endpoint_of_the_mix_succeeds_in_process(self):
+        fixtures = loadtest.Fixtures(users=2)
+        session = loadtest.Session(
+            loadtest.InProcessTarget(), fixtures, random.Random(0)
+        )
+
+        for name, call in loadtest.ENDPOINTS.items():
+            with self.subTest(endpoint=name):
+                self.assertLess(call(session), 400)
+
+    def test_fixtures_need_seeded_data(self):
+        Project.objects.update(is_accepted=False)
+
+        with self.assertRaisesMessage(ValueError, "run seed_data first"):
+            loadtest.Fixtures(users=2)
+
+
+class ResizeImageTests(TestCase):
+    def setUp(self):
+        media = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.cache_root = media / "resize_cache"
+        self.enterContext(
+            override_settings(
+                MEDIA_ROOT=media,
+                IMAGE_RESIZE_CACHE_ROOT=self.cache_root,
+                IMAGE_RESIZE_CACHE_BYTES=64 * 1024 * 1024,
+                IMAGE_RESIZE_SIZES=[(64, 64), (128, 128)],
+            )
+        )
+        for name in ("images/photo.png", "blobs/ab/cd/abcd.png"):
+            (media / name).parent.mkdir(parents=True)
+            Image.new("RGB", (300, 200), "teal").save(media / name)
+        self.render = self.enterContext(
+            mock.patch.object(resize, "render", wraps=resize.render)
+        )
+
+    def cached_files(self):
+        return sorted(entry.name for entry in self.cache_root.iterdir())
+
+    def test_miss_renders_and_hit_reads_the_cache(self):
+        miss = self.client.get("/media/resize/64x64/images/photo.png?format=jpeg")
+        hit = self.client.get("/media/resize/64x64/images/photo.png?format=jpeg")
+
+        self.assertEqual(miss.status_code, 200)
+        self.assertEqual(hit.status_code, 200)
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit["Content-Type"], "image/jpeg")
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_unlisted_size_is_rejected(self):
+        response = self.client.get("/media/resize/100x100/images/photo.png")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.render.called)
+        request = RequestFactory().get("/api/projects", {"image_size": "100x100"})
+        self.assertIsNone(resize.requested_size(request))
+        request = RequestFactory().get("/api/projects", {"image_size": "128x128"})
+        self.assertEqual(resize.requested_size(request), (128, 128))
+
+    def test_only_blobs_are_immutable(self):
+        blob = self.client.get("/media/resize/64x64/blobs/ab/cd/abcd.png")
+        named = self.client.get("/media/resize/64x64/images/photo.png")
+
+        self.assertIn("immutable", blob["Cache-Control"])
+        self.assertEqual(
+            named["Cache-Control"],
+            f"public, max-age={settings.IMAGE_RESIZE_MUTABLE_MAX_AGE}",
+        )
+
+    def test_store_evicts_the_least_recently_served(self):
+        self.cache_root.mkdir()
+        for age, name in ((2000, "old.webp"), (1000, "recent.webp")):
+            path = self.cache_root / name
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (path.stat().st_mtime - age,) * 2)
+
+        with override_settings(IMAGE_RESIZE_CACHE_BYTES=250):
+            resize.store(self.cache_root / "new.webp", b"x" * 100)
+
+        self.assertEqual(self.cached_files(), ["new.webp", "recent.webp"])
+
+    def test_store_scans_the_cache_only_when_over_budget(self):
+        evict = self.enterContext(
+            mock.patch.object(resize, "evict", wraps=resize.evict)
+        )
+
+        with override_settings(IMAGE_RESIZE_CACHE_BYTES=1000):
+            for i in range(10):
+                resize.store(self.cache_root / f"{i}.webp", b"x" * 100)
+            # the first write counts what is on disk
+            self.assertEqual(evict.call_count, 1)
+            resize.store(self.cache_root / "10.webp", b"x" * 100)
+
+        self.assertEqual(evict.call_count, 2)
+        self.assertEqual(len(self.cached_files()), 9)
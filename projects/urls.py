@@ -13,9 +13,11 @@ from .views import (
     CancelProjectView,
     DonationStore,
     DonationDetailAPIView,
+    DonationBulkStore,
     CategoryAPIView,
     ProjectFeatured,
     ProjectAccepted,
+    ResponseCacheStats,
 )
 
 urlpatterns = [
@@ -81,6 +83,11 @@ urlpatterns = [
         DonationStore.as_view(),
         name="project-donation-store",
     ),
+    path(
+        "donations/bulk",
+        DonationBulkStore.as_view(),
+        name="donation-bulk-store",
+    ),
     path(
         "projects/donation/<int:pk>",
         DonationDetailAPIView.as_view(),
@@ -91,4 +98,9 @@ urlpatterns = [
         CategoryAPIView.as_view(),
         name="category",
     ),
+    path(
+        "cache/stats",
+        ResponseCacheStats.as_view(),
+        name="response-cache-stats",
+    ),
 ]
@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from .models import (
     Project,
     Comments,
@@ -25,34 +26,36 @@ from .serializers import (
     ProjectAcceptSerializer,
 )
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from rest_framework.pagination import PageNumberPagination
 from .permissions import IsOwnerOrAdmin
-
-
-class CustomPagination(PageNumberPagination):
-    def get_paginated_response(self, data):
-        # Get total stats
-        total_money_raised = Project.get_total_money_raised()
-        total_active_projects = Project.objects.filter(is_active=True).count()
-        total_featured = Project.objects.filter(is_featured=True).count()
-
-        return Response(
-            {
-                "count": self.page.paginator.count,
-                "next": self.get_next_link(),
-                "previous": self.get_previous_link(),
-                "results": data,
-                "statistics": {
-                    "total_money_raised": total_money_raised,
-                    "total_active_projects": total_active_projects,
-                    "total_featured": total_featured,
-                },
-            }
-        )
+from .pagination import (
+    CustomPagination,
+    ProjectCursorPagination,
+    SizedPageNumberPagination,
+    get_paginator,
+)
+from . import cache as project_cache
+from .conditional import conditional_response, project_validators
+from .bulk import ingest_donations, summarize
 
 
 class ProjectListCreateAPIView(APIView):
     parser_classes = [MultiPartParser, FormParser]
+    filter_params = [
+        "is_featured",
+        "category",
+        "tags",
+        "tags_match",
+        "user_id",
+        "search",
+        "created_after",
+        "created_before",
+        "ordering",
+        "latest",
+        "is_top",
+        "trending",
+        "window",
+        "limit",
+    ]
 
     def get_permissions(self):
         if self.request.method == "GET":
@@ -60,27 +63,19 @@ class ProjectListCreateAPIView(APIView):
         return [IsAuthenticated()]
 
     def get(self, request):
-        is_featured = request.query_params.get("is_featured")
-        category = request.query_params.get("category")
-        user_id = request.query_params.get("user_id")
+        return project_cache.cached_response(request, lambda: self.list(request))
+
+    def list(self, request):
+        filters = {
+            param: request.query_params[param]
+            for param in self.filter_params
+            if param in request.query_params
+        }
         user = request.user if request.user.is_authenticated else None
-        limit = request.query_params.get("limit")
-        is_top = request.query_params.get("is_top")
-        latest = request.query_params.get("latest")
-        search = request.query_params.get("search")
-        tags = request.query_params.get("tags")
-        projects = Project.filterProjects(
-            is_featured=is_featured,
-            category=category,
-            tags=tags,
-            user=user,
-            limit=limit,
-            is_top=is_top,
-            latest=latest,
-            search=search,
-            user_id=user_id,
+        projects = Project.filterProjects(user=user, with_stats=True, **filters)
+        paginator = get_paginator(
+            request, projects, CustomPagination, ProjectCursorPagination
         )
-        paginator = CustomPagination()
         paginated_Projects = paginator.paginate_queryset(projects, request)
         serializer = ProjectStoreSerializer(
             paginated_Projects, many=True, context={"request": request}
@@ -116,6 +111,15 @@ class ProjectDetailAPIView(APIView):
         return get_object_or_404(Project, pk=pk, is_active=True)
 
     def get(self, request, pk):
+        return conditional_response(
+            request,
+            project_validators("project", pk, is_active=True),
+            lambda: project_cache.cached_response(
+                request, lambda: self.retrieve(request, pk), project_id=pk
+            ),
+        )
+
+    def retrieve(self, request, pk):
         project = self.get_object(pk)
         serializer = ProjectDetailSerializer(project, context={"request": request})
         return Response(serializer.data)
@@ -162,9 +166,18 @@ class CommentStore(APIView):
         return [IsAuthenticated()]
 
     def get(self, request, pk):
+        return conditional_response(
+            request,
+            project_validators("comments", pk),
+            lambda: project_cache.cached_feed(
+                request, pk, "comments", lambda: self.list(request, pk)
+            ),
+        )
+
+    def list(self, request, pk):
         project = get_object_or_404(Project, pk=pk)
-        comments = Comments.objects.filter(project=project)
-        paginator = PageNumberPagination()
+        comments = Comments.getProjectFeed(project)
+        paginator = get_paginator(request, comments)
         paginated_comments = paginator.paginate_queryset(comments, request)
         serializer = CommentSerializer(
             paginated_comments, many=True, context={"request": request}
@@ -211,9 +224,18 @@ class RattingStore(APIView):
         return [IsAuthenticated()]
 
     def get(self, request, pk):
+        return conditional_response(
+            request,
+            project_validators("ratings", pk),
+            lambda: project_cache.cached_feed(
+                request, pk, "ratings", lambda: self.list(request, pk)
+            ),
+        )
+
+    def list(self, request, pk):
         project = get_object_or_404(Project, pk=pk)
-        ratings = Ratting.objects.filter(project=project)
-        paginator = PageNumberPagination()
+        ratings = Ratting.getProjectFeed(project)
+        paginator = get_paginator(request, ratings)
         paginated_ratings = paginator.paginate_queryset(ratings, request)
         serializer = RattingSerializer(
             paginated_ratings, many=True, context={"request": request}
@@ -224,7 +246,8 @@ class RattingStore(APIView):
         project = get_object_or_404(Project, pk=pk)
         serialzier = RattingSerializer(data=request.data)
         if serialzier.is_valid():
-            rate = serialzier.save(user=request.user, project=project)
+            with transaction.atomic():
+                rate = serialzier.save(user=request.user, project=project)
             result_serializer = RattingSerializer(rate)
             return Response(result_serializer.data, status=status.HTTP_201_CREATED)
         return Response(serialzier.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -248,7 +271,8 @@ class RattingDetailAPIView(APIView):
         rate = self.get_object(pk)
         serializer = RattingSerializer(rate)
         data = serializer.data
-        rate.delete()
+        with transaction.atomic():
+            rate.delete()
         return Response(data, status=status.HTTP_200_OK)
 
 
@@ -264,8 +288,9 @@ class CommentsReportsStore(APIView):
             reports = CommentsReports.objects.all()
         else:
             reports = CommentsReports.objects.filter(pk=pk)
+        reports = reports.select_related("user").order_by("-created_at", "-id")
 
-        paginator = PageNumberPagination()
+        paginator = SizedPageNumberPagination()
         paginated_reports = paginator.paginate_queryset(reports, request)
         serializer = CommentsReportsSerializer(
             paginated_reports, many=True, context={"request": request}
@@ -313,8 +338,12 @@ class ProjectReportsStore(APIView):
 
     def get(self, request, pk):
         project = get_object_or_404(Project, pk=pk)
-        reports = ProjectsReports.objects.filter(project=project)
-        paginator = PageNumberPagination()
+        reports = (
+            ProjectsReports.objects.filter(project=project)
+            .select_related("user")
+            .order_by("-created_at", "-id")
+        )
+        paginator = SizedPageNumberPagination()
         paginated_reports = paginator.paginate_queryset(reports, request)
         serializer = ProjectsReportsSerializer(
             paginated_reports, many=True, context={"request": request}
@@ -379,12 +408,23 @@ class DonationStore(APIView):
         return [IsAuthenticated()]
 
     def get(self, request, pk):
+        if pk == 0:
+            # the all-donations listing has no single version to validate
+            return self.list(request, pk)
+        return conditional_response(
+            request,
+            project_validators("donations", pk),
+            lambda: self.list(request, pk),
+        )
+
+    def list(self, request, pk):
         if pk == 0:
             donations = Donation.objects.all()
         else:
             project = get_object_or_404(Project, pk=pk)
             donations = Donation.objects.filter(project=project)
-        paginator = PageNumberPagination()
+        donations = Donation.withSummaries(donations)
+        paginator = get_paginator(request, donations)
         paginated_donations = paginator.paginate_queryset(donations, request)
         serializer = DonationSerializer(
             paginated_donations, many=True, context={"request": request}
@@ -395,12 +435,44 @@ class DonationStore(APIView):
         serialzier = DonationSerializer(data=request.data)
         if serialzier.is_valid():
             project = get_object_or_404(Project, pk=pk)
-            rate = serialzier.save(user=request.user, project=project)
+            with transaction.atomic():
+                rate = serialzier.save(user=request.user, project=project)
             result_serializer = DonationSerializer(rate)
             return Response(result_serializer.data, status=status.HTTP_201_CREATED)
         return Response(serialzier.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class DonationBulkStore(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    max_rows = 10000
+
+    def post(self, request):
+        rows = request.data
+        if isinstance(rows, dict):
+            rows = rows.get("donations")
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {"error": "Expected a non-empty list of donations."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(rows) > self.max_rows:
+            return Response(
+                {"error": f"At most {self.max_rows} donations per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = ingest_donations(rows)
+        summary = summarize(results)
+        return Response(
+            {**summary, "results": results},
+            status=(
+                status.HTTP_201_CREATED
+                if summary["created"]
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+
 class DonationDetailAPIView(APIView):
     def get_permissions(self):
         if self.request.method == "GET":
@@ -472,3 +544,10 @@ class ProjectAccepted(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ResponseCacheStats(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(project_cache.stats())